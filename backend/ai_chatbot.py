@@ -2,17 +2,68 @@ from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langgraph.graph import StateGraph, END
-from typing import TypedDict, Annotated, Sequence
+from typing import AsyncIterator, TypedDict, Annotated, Sequence
 import operator
 from backend.config import settings
-from backend.database import get_database
+from backend.database import get_database, get_secondary_database
+from backend.cache import TTLCache
+from backend.collection_versions import on_version_bump
+from backend.conversation import conversation_memory, ROLE_USER
+from backend.llm_cache import llm_cache, cache_key
+from backend.llm_limiter import llm_limiter, LLMError
 from datetime import datetime
+import asyncio
+
+# Assignments and upcoming schedule entries included in the prompt
+CONTEXT_ITEM_LIMIT = 10
+
+# Formatted chat context per user. Writes made through this process evict the
+# entry at once; writes made through other instances show up within the TTL.
+_context_cache = TTLCache(maxsize=settings.CHAT_CONTEXT_CACHE_SIZE, ttl=settings.CHAT_CONTEXT_CACHE_TTL_SECONDS)
+# Users this process wrote for recently; a secondary may not have their change yet,
+# so their context is read from the primary until the staleness bound has passed
+_recent_writers = TTLCache(maxsize=settings.CHAT_CONTEXT_CACHE_SIZE, ttl=settings.MONGO_MAX_STALENESS_SECONDS)
+
+@on_version_bump
+def _invalidate_context(user_id: str, collections) -> None:
+    _context_cache.pop(user_id)
+    _recent_writers.set(user_id, True)
+
+def _format_user_context(courses: list, assignments: list, schedules: list) -> dict:
+    """Shape the projected course, assignment and schedule documents for the prompt"""
+    return {
+        "courses": [
+            {
+                "name": c.get("course_name"),
+                "code": c.get("course_code"),
+                "instructor": c.get("instructor")
+            } for c in courses
+        ],
+        "assignments": [
+            {
+                "title": a.get("title"),
+                "course_id": str(a.get("course_id")),
+                "due_date": a.get("due_date").strftime("%Y-%m-%d %H:%M") if a.get("due_date") else None,
+                "priority": a.get("priority")
+            } for a in assignments
+        ],
+        "schedules": [
+            {
+                "title": s.get("title"),
+                "start_time": s.get("start_time").strftime("%Y-%m-%d %H:%M") if s.get("start_time") else None,
+                "end_time": s.get("end_time").strftime("%Y-%m-%d %H:%M") if s.get("end_time") else None,
+                "location": s.get("location")
+            } for s in schedules
+        ]
+    }
 
 # Define the state for our graph
 class AgentState(TypedDict):
     messages: Annotated[Sequence[HumanMessage | AIMessage | SystemMessage], operator.add]
     user_id: str
     user_context: dict
+    conversation_summary: str
+    failed: bool
 
 class AcademicPlannerChatbot:
     def __init__(self):
@@ -25,65 +76,56 @@ class AcademicPlannerChatbot:
             self.llm = ChatOpenAI(
                 model="gpt-3.5-turbo",
                 temperature=0.7,
-                api_key=settings.OPENAI_API_KEY
+                api_key=settings.OPENAI_API_KEY,
+                # Deadlines and retries are enforced by llm_limiter
+                timeout=settings.CHAT_LLM_TIMEOUT_SECONDS,
+                max_retries=0
             )
             self.graph = self._create_graph()
     
     async def get_user_context(self, user_id: str) -> dict:
-        """Fetch user's courses, assignments, and schedules for context"""
+        """Fetch user's courses, assignments, and schedules for context.
+        
+        Served from a per-user cache that is dropped whenever this process
+        changes the user's courses, assignments or schedules. Misses read from
+        a secondary, except right after such a change, so a lagging secondary
+        never puts context older than the change into the cache.
+        """
+        context = _context_cache.get(user_id)
+        if context is not None:
+            return context
         try:
-            db = await get_database()
-            
-            # Get courses
-            courses = await db.courses.find({"user_id": user_id}).to_list(length=None)
-            
-            # Get assignments
-            assignments = await db.assignments.find({
-                "user_id": user_id,
-                "completed": False
-            }).sort("due_date", 1).to_list(length=None)
-            
-            # Get upcoming schedules
+            if _recent_writers.get(user_id):
+                db = await get_database()
+            else:
+                db = await get_secondary_database()
             now = datetime.utcnow()
-            schedules = await db.schedules.find({
-                "user_id": user_id,
-                "start_time": {"$gte": now}
-            }).sort("start_time", 1).limit(10).to_list(length=None)
             
-            # Format context
-            context = {
-                "courses": [
-                    {
-                        "name": c.get("course_name"),
-                        "code": c.get("course_code"),
-                        "instructor": c.get("instructor")
-                    } for c in courses
-                ],
-                "assignments": [
-                    {
-                        "title": a.get("title"),
-                        "course_id": str(a.get("course_id")),
-                        "due_date": a.get("due_date").strftime("%Y-%m-%d %H:%M") if a.get("due_date") else None,
-                        "priority": a.get("priority")
-                    } for a in assignments[:10]  # Limit to 10 most recent
-                ],
-                "schedules": [
-                    {
-                        "title": s.get("title"),
-                        "start_time": s.get("start_time").strftime("%Y-%m-%d %H:%M") if s.get("start_time") else None,
-                        "end_time": s.get("end_time").strftime("%Y-%m-%d %H:%M") if s.get("end_time") else None,
-                        "location": s.get("location")
-                    } for s in schedules
-                ]
-            }
+            # Limits and projections are applied by Mongo; the three queries run concurrently
+            courses, assignments, schedules = await asyncio.gather(
+                db.courses.find(
+                    {"user_id": user_id},
+                    {"course_name": 1, "course_code": 1, "instructor": 1}
+                ).to_list(length=None),
+                db.assignments.find(
+                    {"user_id": user_id, "completed": False},
+                    {"title": 1, "course_id": 1, "due_date": 1, "priority": 1}
+                ).sort("due_date", 1).limit(CONTEXT_ITEM_LIMIT).to_list(length=None),
+                db.schedules.find(
+                    {"user_id": user_id, "start_time": {"$gte": now}},
+                    {"title": 1, "start_time": 1, "end_time": 1, "location": 1}
+                ).sort("start_time", 1).limit(CONTEXT_ITEM_LIMIT).to_list(length=None)
+            )
             
+            context = _format_user_context(courses, assignments, schedules)
+            _context_cache.set(user_id, context)
             return context
         except Exception as e:
             print(f"Error getting user context: {str(e)}")
             return {"courses": [], "assignments": [], "schedules": []}
     
-    def _create_system_prompt(self, user_context: dict) -> str:
-        """Create a system prompt with user context"""
+    def _create_system_prompt(self, user_context: dict, conversation_summary: str = "") -> str:
+        """Create a system prompt with user context and a summary of earlier conversation"""
         courses_text = "\n".join([f"- {c['name']} ({c['code']})" for c in user_context.get("courses", [])])
         assignments_text = "\n".join([
             f"- {a['title']} (Due: {a['due_date']}, Priority: {a['priority']})" 
@@ -93,6 +135,7 @@ class AcademicPlannerChatbot:
             f"- {s['title']} ({s['start_time']} to {s['end_time']})" 
             for s in user_context.get("schedules", [])
         ])
+        summary_text = f"\n\nEARLIER IN THIS CONVERSATION:\n{conversation_summary}" if conversation_summary else ""
         
         return f"""You are an AI academic planning assistant for students. Your role is to help students:
 1. Manage their time effectively
@@ -116,32 +159,37 @@ UPCOMING SCHEDULE:
 
 Provide helpful, actionable advice based on the student's current academic situation. Be encouraging, practical, and specific. When suggesting study plans or time management strategies, consider their actual course load and deadlines.
 
-If asked about specific assignments or courses, refer to the information provided above. If you don't have enough information, ask clarifying questions."""
+If asked about specific assignments or courses, refer to the information provided above. If you don't have enough information, ask clarifying questions.{summary_text}"""
 
+    def _build_messages(self, state: AgentState) -> list:
+        """The system prompt with user context, followed by the conversation"""
+        system_prompt = self._create_system_prompt(state["user_context"], state.get("conversation_summary", ""))
+        return [SystemMessage(content=system_prompt)] + list(state["messages"])
+    
     async def process_node(self, state: AgentState) -> AgentState:
         """Process the user's message and generate a response"""
         try:
-            # Create system prompt with context
-            system_prompt = self._create_system_prompt(state["user_context"])
-            
-            # Create messages list
-            messages = [SystemMessage(content=system_prompt)] + list(state["messages"])
-            
             # Get response from LLM
-            response = await self.llm.ainvoke(messages)
+            response = await llm_limiter.call(self.llm.ainvoke, self._build_messages(state))
             
             # Add AI response to messages
             return {
                 "messages": [AIMessage(content=response.content)],
                 "user_id": state["user_id"],
-                "user_context": state["user_context"]
+                "user_context": state["user_context"],
+                "conversation_summary": state.get("conversation_summary", ""),
+                "failed": False
             }
+        except LLMError:
+            raise
         except Exception as e:
             error_message = f"I apologize, but I encountered an error: {str(e)}. Please try again."
             return {
                 "messages": [AIMessage(content=error_message)],
                 "user_id": state["user_id"],
-                "user_context": state["user_context"]
+                "user_context": state["user_context"],
+                "conversation_summary": state.get("conversation_summary", ""),
+                "failed": True
             }
     
     def _create_graph(self):
@@ -160,21 +208,65 @@ If asked about specific assignments or courses, refer to the information provide
         # Compile the graph
         return workflow.compile()
     
+    async def _initial_state(self, user_id: str, message: str) -> AgentState:
+        """Context, rolling summary and recent history for a new turn, loaded concurrently"""
+        user_context, (summary, history) = await asyncio.gather(
+            self.get_user_context(user_id),
+            conversation_memory.load(user_id)
+        )
+        messages = [
+            HumanMessage(content=content) if role == ROLE_USER else AIMessage(content=content)
+            for role, content in history
+        ]
+        return {
+            "messages": messages + [HumanMessage(content=message)],
+            "user_id": user_id,
+            "user_context": user_context,
+            "conversation_summary": summary,
+            "failed": False
+        }
+    
+    def _cache_key(self, state: AgentState, message: str) -> str:
+        """Response cache key: the user, the message and the system prompt it would be answered under.
+        
+        Scoped to the user so a reply quoting one student's conversation is
+        never served to another. Recent verbatim turns are left out, since
+        every turn is appended to them and a repeated question would never
+        hit; the rolling summary and the user's courses, assignments and
+        schedules are part of the prompt.
+        """
+        system_prompt = self._create_system_prompt(state["user_context"], state["conversation_summary"])
+        return cache_key(state["user_id"], message, system_prompt)
+    
+    async def _summarize(self, previous_summary: str, messages: list) -> str:
+        """Fold older turns into the rolling conversation summary"""
+        transcript = "\n".join(f"{role.upper()}: {content}" for role, content in messages)
+        prompt = f"""Update the summary of a conversation between a student and their academic planning assistant.
+Keep facts the student shared, decisions made and open questions. Reply with the summary only, in at most {settings.CHAT_SUMMARY_MAX_WORDS} words.
+
+CURRENT SUMMARY:
+{previous_summary or "(none)"}
+
+NEW MESSAGES:
+{transcript}"""
+        response = await llm_limiter.call(self.llm.ainvoke, [HumanMessage(content=prompt)])
+        return response.content.strip()
+    
     async def chat(self, user_id: str, message: str) -> str:
         """Main chat interface"""
         try:
             # Initialize LLM if not already done
             self._initialize()
             
-            # Get user context
-            user_context = await self.get_user_context(user_id)
+            # Create initial state from user context and conversation history
+            initial_state = await self._initial_state(user_id, message)
             
-            # Create initial state
-            initial_state = {
-                "messages": [HumanMessage(content=message)],
-                "user_id": user_id,
-                "user_context": user_context
-            }
+            # Answer repeated questions against unchanged context without calling the model
+            key = self._cache_key(initial_state, message)
+            cached = await llm_cache.get(key)
+            if cached is not None:
+                conversation_memory.record_turn(user_id, message, cached, self._summarize)
+                return cached
             
             # Run the graph
             result = await self.graph.ainvoke(initial_state)
@@ -182,13 +274,46 @@ If asked about specific assignments or courses, refer to the information provide
             # Extract the last AI message
             ai_messages = [msg for msg in result["messages"] if isinstance(msg, AIMessage)]
             if ai_messages:
-                return ai_messages[-1].content
+                reply = ai_messages[-1].content
+                if not result.get("failed"):
+                    await llm_cache.set(key, reply)
+                    conversation_memory.record_turn(user_id, message, reply, self._summarize)
+                return reply
             else:
                 return "I'm sorry, I couldn't generate a response. Please try again."
                 
+        except LLMError:
+            raise
         except Exception as e:
             print(f"Chat error: {str(e)}")
             return f"I apologize, but I encountered an error processing your request. Please ensure your OpenAI API key is configured correctly and try again."
 
+    async def stream_chat(self, user_id: str, message: str) -> AsyncIterator[str]:
+        """Yield the reply to a message chunk by chunk as the model generates it.
+        
+        Builds the same prompt as the graph's process node but streams from
+        the model directly; the pinned langgraph release cannot stream tokens
+        out of a node. Errors propagate so the caller can report them. Only
+        replies streamed to completion are saved to the conversation history.
+        """
+        self._initialize()
+        state = await self._initial_state(user_id, message)
+        key = self._cache_key(state, message)
+        cached = await llm_cache.get(key)
+        if cached is not None:
+            conversation_memory.record_turn(user_id, message, cached, self._summarize)
+            yield cached
+            return
+        
+        chunks = []
+        messages = self._build_messages(state)
+        async for chunk in llm_limiter.stream(lambda: self.llm.astream(messages)):
+            if chunk.content:
+                chunks.append(chunk.content)
+                yield chunk.content
+        reply = "".join(chunks)
+        await llm_cache.set(key, reply)
+        conversation_memory.record_turn(user_id, message, reply, self._summarize)
+
 # Create a singleton instance
 chatbot = AcademicPlannerChatbot()
@@ -1,16 +1,23 @@
 from datetime import datetime, timedelta
+import time
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from bson import ObjectId
 from backend.config import settings
 from backend.models import TokenData, User
 from backend.database import get_database
+from backend.cache import TTLCache
+from backend.passwords import pwd_context
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+# Signature-verified token payloads, keyed by the raw token
+_verified_tokens = TTLCache(maxsize=settings.AUTH_TOKEN_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+# User documents keyed by str(_id); also the source of the current token version
+_user_cache = TTLCache(maxsize=settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -27,26 +34,90 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
+def create_user_access_token(user: dict, expires_delta: Optional[timedelta] = None) -> str:
+    """Issue a token that carries the user id and current token version"""
+    return create_access_token(
+        data={
+            "sub": user["email"],
+            "uid": str(user["_id"]),
+            "ver": user.get("token_version", 0),
+        },
+        expires_delta=expires_delta,
+    )
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _decode_token(token: str) -> dict:
+    """Decode a JWT, reusing the result of an earlier signature check"""
+    payload = _verified_tokens.get(token)
+    if payload is not None:
+        if payload["exp"] <= time.time():
+            _verified_tokens.pop(token)
+            raise _credentials_exception()
+        return payload
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
     except JWTError:
-        raise credentials_exception
-    
+        raise _credentials_exception()
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+
+    if "exp" in payload:
+        remaining = payload["exp"] - time.time()
+        _verified_tokens.set(token, payload, ttl=min(remaining, settings.AUTH_CACHE_TTL_SECONDS))
+    return payload
+
+async def _load_user(payload: dict) -> dict:
+    """Return the user for a decoded token, from cache when possible"""
+    user_id = payload.get("uid")
+    if user_id is not None:
+        user = _user_cache.get(user_id)
+        if user is None:
+            if not ObjectId.is_valid(user_id):
+                raise _credentials_exception()
+            db = await get_database()
+            user = await db.users.find_one({"_id": ObjectId(user_id)})
+            if user is None:
+                raise _credentials_exception()
+            _user_cache.set(user_id, user)
+        if payload.get("ver", 0) != user.get("token_version", 0):
+            raise _credentials_exception()
+        return user
+
+    # Tokens issued before ids were embedded only carry the email
+    token_data = TokenData(email=payload["sub"])
     db = await get_database()
     user = await db.users.find_one({"email": token_data.email})
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
 
-async def get_current_user_id(current_user: dict = Depends(get_current_user)) -> str:
-    return str(current_user["_id"])
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    payload = _decode_token(token)
+    return await _load_user(payload)
+
+async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> str:
+    payload = _decode_token(token)
+    # Served from the user cache without a database round trip when warm
+    user = await _load_user(payload)
+    return str(user["_id"])
+
+async def revoke_user_tokens(user_id: str) -> None:
+    """Invalidate every token issued to a user by bumping their token version.
+
+    Other processes pick up the new version once their cached copy of the
+    user expires, i.e. within AUTH_CACHE_TTL_SECONDS.
+    """
+    db = await get_database()
+    await db.users.update_one({"_id": ObjectId(user_id)}, {"$inc": {"token_version": 1}})
+    _user_cache.pop(user_id)
+
+def forget_cached_user(user_id: str) -> None:
+    """Drop this process's cached copy of a user after their document changes"""
+    _user_cache.pop(user_id)
@@ -0,0 +1 @@
+# Benchmarks for the backend; run individual modules with python -m
@@ -0,0 +1,80 @@
+"""Import-time profile of the app, from python -X importtime in a fresh interpreter.
+
+Shows the total cost of importing the module, the packages that account for
+it and the slowest individual modules. The suite tracks the same cold start
+as startup.import_backend_main.
+
+    python -m backend.benchmarks.importtime --top 20
+    python -m backend.benchmarks.importtime --module backend.routers.chat --json chat-imports.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def profile(module: str) -> List[Tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) for every import made while importing `module`"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+def summarize(entries: List[Tuple[str, int, int]], module: str, top: int) -> dict:
+    by_package = defaultdict(int)
+    for name, self_us, _ in entries:
+        by_package[name.split(".")[0]] += self_us
+    total = next((cumulative for name, _, cumulative in entries if name == module), 0)
+    return {
+        "module": module,
+        "total_ms": round(total / 1000, 1),
+        "packages_ms": {
+            package: round(us / 1000, 1)
+            for package, us in sorted(by_package.items(), key=lambda item: -item[1])[:top]
+        },
+        "modules_self_ms": {
+            name: round(self_us / 1000, 1)
+            for name, self_us, _ in sorted(entries, key=lambda entry: -entry[1])[:top]
+        },
+    }
+
+def main(module: str, runs: int, top: int, json_path: str = None) -> None:
+    # Keep the fastest run; the first one also pays for writing bytecode caches
+    entries = min(
+        (profile(module) for _ in range(runs)),
+        key=lambda run: next((cumulative for name, _, cumulative in run if name == module), 0)
+    )
+    summary = summarize(entries, module, top)
+    print(f"import {module}: {summary['total_ms']:.1f} ms (best of {runs})\n")
+    print("By top-level package (self time):")
+    for package, ms in summary["packages_ms"].items():
+        print(f"  {package:<40} {ms:>8.1f} ms")
+    print("\nSlowest modules (self time):")
+    for name, ms in summary["modules_self_ms"].items():
+        print(f"  {name:<40} {ms:>8.1f} ms")
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(summary, f, indent=2)
+            f.write("\n")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="backend.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", help="also write the summary to this file")
+    args = parser.parse_args()
+    main(args.module, args.runs, args.top, args.json)
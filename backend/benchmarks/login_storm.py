@@ -0,0 +1,67 @@
+"""Event-loop latency during a login storm.
+
+Simulates N concurrent logins while a heartbeat task measures how late the
+event loop wakes it up, once with bcrypt running inline (the old behaviour)
+and once with hashing in the worker pool.
+
+    python -m backend.benchmarks.login_storm --logins 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from backend.passwords import pwd_context, verify_password, shutdown_password_pool
+
+HEARTBEAT_INTERVAL = 0.005
+
+async def _heartbeat(lags: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        lags.append((time.perf_counter() - started - HEARTBEAT_INTERVAL) * 1000)
+
+async def _inline_login(password: str, hashed: str) -> None:
+    pwd_context.verify(password, hashed)
+
+async def _pooled_login(password: str, hashed: str) -> None:
+    await verify_password(password, hashed)
+
+async def _run(login, logins: int, password: str, hashed: str) -> dict:
+    lags = []
+    stop = asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(lags, stop))
+    await asyncio.sleep(HEARTBEAT_INTERVAL * 2)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login(password, hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await heartbeat
+    lags.sort()
+    return {
+        "logins_per_sec": logins / elapsed,
+        "lag_p50_ms": statistics.median(lags),
+        "lag_p99_ms": lags[int(len(lags) * 0.99) - 1] if len(lags) > 1 else lags[-1],
+        "lag_max_ms": lags[-1],
+    }
+
+def _report(name: str, result: dict) -> None:
+    print(
+        f"{name:<8} {result['logins_per_sec']:>8.1f} logins/s  "
+        f"loop lag p50 {result['lag_p50_ms']:>7.1f} ms  "
+        f"p99 {result['lag_p99_ms']:>7.1f} ms  max {result['lag_max_ms']:>7.1f} ms"
+    )
+
+async def main(logins: int) -> None:
+    password = "correct horse battery staple"
+    hashed = pwd_context.hash(password)
+    _report("inline", await _run(_inline_login, logins, password, hashed))
+    _report("pooled", await _run(_pooled_login, logins, password, hashed))
+    shutdown_password_pool()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins))
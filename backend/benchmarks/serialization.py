@@ -0,0 +1,87 @@
+"""Serialization cost for a 1k-item assignment list.
+
+Compares the previous path (per-item AssignmentResponse validation, then
+FastAPI's jsonable_encoder and json.dumps) with the compiled serializer
+encoded by orjson and by MessagePack.
+
+    python -m backend.benchmarks.serialization --items 1000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from backend.models import AssignmentResponse
+from backend.serialization import serialize_assignment, MsgPackResponse, msgpack
+from fastapi.responses import ORJSONResponse
+
+def _documents(count: int) -> list:
+    now = datetime.utcnow()
+    course_id = str(ObjectId())
+    return [
+        {
+            "_id": ObjectId(),
+            "title": f"Problem set {i}",
+            "description": "Chapters 3 and 4, odd-numbered exercises",
+            "course_id": course_id,
+            "due_date": now + timedelta(hours=i),
+            "priority": "medium",
+            "completed": i % 3 == 0,
+            "reminder_sent": False,
+            "user_id": str(ObjectId()),
+            "created_at": now,
+        }
+        for i in range(count)
+    ]
+
+def _pydantic(documents: list) -> bytes:
+    items = [
+        AssignmentResponse(
+            id=str(d["_id"]),
+            title=d["title"],
+            description=d.get("description"),
+            course_id=str(d["course_id"]),
+            course_name="Calculus",
+            due_date=d["due_date"],
+            priority=d["priority"],
+            completed=d["completed"],
+            created_at=d.get("created_at", datetime.utcnow()),
+        )
+        for d in documents
+    ]
+    return json.dumps(jsonable_encoder(items)).encode()
+
+def _compiled_orjson(documents: list) -> bytes:
+    items = [serialize_assignment(d, course_name="Calculus") for d in documents]
+    return ORJSONResponse(items).body
+
+def _compiled_msgpack(documents: list) -> bytes:
+    items = [serialize_assignment(d, course_name="Calculus") for d in documents]
+    return MsgPackResponse(items).body
+
+def _measure(func, documents: list, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = func(documents)
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000, len(body)
+
+def main(items: int, repeat: int) -> None:
+    documents = _documents(items)
+    cases = [("pydantic + json", _pydantic), ("compiled + orjson", _compiled_orjson)]
+    if msgpack is not None:
+        cases.append(("compiled + msgpack", _compiled_msgpack))
+    baseline = None
+    for name, func in cases:
+        best_ms, size = _measure(func, documents, repeat)
+        baseline = baseline or best_ms
+        print(f"{name:<20} {best_ms:>8.2f} ms  {size / 1024:>7.1f} KiB  {baseline / best_ms:>5.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.items, args.repeat)
@@ -0,0 +1,74 @@
+"""Messages per second: pooled SMTP connections vs one connection per message.
+
+Starts a local aiosmtpd sink (pip install aiosmtpd) and sends the same
+messages with aiosmtplib.send and with SMTPPool at the same concurrency.
+
+    python -m backend.benchmarks.smtp_pool --messages 500 --concurrency 4
+"""
+import argparse
+import asyncio
+import time
+from email.mime.text import MIMEText
+import aiosmtplib
+from aiosmtpd.controller import Controller
+from backend.smtp_pool import SMTPPool
+
+HOST = "127.0.0.1"
+
+class _Sink:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+def _message(index: int) -> MIMEText:
+    message = MIMEText(f"<p>Reminder {index}</p>", "html")
+    message["From"] = "planner@example.com"
+    message["To"] = f"student{index}@example.com"
+    message["Subject"] = f"Reminder {index}"
+    return message
+
+async def _run(send, messages: int, concurrency: int) -> float:
+    queue = asyncio.Queue()
+    for index in range(messages):
+        queue.put_nowait(index)
+
+    async def worker():
+        while not queue.empty():
+            await send(_message(queue.get_nowait()))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return messages / (time.perf_counter() - started)
+
+async def main(messages: int, concurrency: int, port: int) -> None:
+    sink = _Sink()
+    controller = Controller(sink, hostname=HOST, port=port)
+    controller.start()
+    try:
+        async def per_message(message):
+            await aiosmtplib.send(message, hostname=HOST, port=port, start_tls=False)
+
+        pool = SMTPPool(hostname=HOST, port=port, start_tls=False, size=concurrency, max_messages=messages)
+        await pool.start()
+        try:
+            single_rate = await _run(per_message, messages, concurrency)
+            pooled_rate = await _run(pool.send_message, messages, concurrency)
+        finally:
+            await pool.stop()
+    finally:
+        controller.stop()
+
+    print(f"per-message {single_rate:>8.1f} msg/s")
+    print(f"pooled      {pooled_rate:>8.1f} msg/s  ({pooled_rate / single_rate:.1f}x)")
+    print(f"sink received {sink.received} messages")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, args.concurrency, args.port))
@@ -0,0 +1,421 @@
+"""Micro-benchmarks for the code that runs on every request or reminder job.
+
+Results are saved as JSON baselines; `compare` flags any benchmark whose
+median got slower than the baseline by more than the threshold and exits 1.
+
+    python -m backend.benchmarks.suite run --save backend/benchmarks/baselines/main.json
+    python -m backend.benchmarks.suite compare backend/benchmarks/baselines/main.json
+    python -m backend.benchmarks.suite compare base.json head.json --threshold 0.15
+
+Compare numbers from the same machine only; `-k` selects benchmarks by substring.
+Benchmarks whose setup fails (e.g. LangChain not installed for chat.*) are
+reported as skipped and the rest of the suite still runs.
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from bson import ObjectId
+
+# Each round runs the benchmark for at least this long
+MIN_ROUND_SECONDS = 0.2
+BASELINE_VERSION = 1
+
+BENCHMARKS: Dict[str, Callable[[], Callable]] = {}
+
+def benchmark(name: str):
+    """Register a factory that does the setup and returns the callable to time"""
+    def register(factory):
+        BENCHMARKS[name] = factory
+        return factory
+    return register
+
+# Fixtures
+
+def _assignment_documents(count: int) -> List[dict]:
+    now = datetime.utcnow()
+    course_id = ObjectId()
+    return [
+        {
+            "_id": ObjectId(),
+            "title": f"Problem set {i}",
+            "description": "Chapters 3 and 4, odd-numbered exercises",
+            "course_id": str(course_id),
+            "due_date": now + timedelta(hours=i),
+            "priority": ("low", "medium", "high")[i % 3],
+            "completed": i % 3 == 0,
+            "reminder_sent": False,
+            "user_id": str(ObjectId()),
+            "created_at": now,
+        }
+        for i in range(count)
+    ]
+
+def _schedule_documents(count: int) -> List[dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "_id": ObjectId(),
+            "title": f"Lecture {i}",
+            "course_id": str(ObjectId()),
+            "start_time": now + timedelta(days=i, hours=9),
+            "end_time": now + timedelta(days=i, hours=10, minutes=30),
+            "day_of_week": "Monday",
+            "location": f"Room {100 + i}",
+            "user_id": str(ObjectId()),
+            "created_at": now,
+        }
+        for i in range(count)
+    ]
+
+def _course_documents(count: int) -> List[dict]:
+    return [
+        {
+            "_id": ObjectId(),
+            "course_name": f"Course {i}",
+            "course_code": f"CS{100 + i}",
+            "instructor": f"Dr. Instructor {i}",
+            "description": "Lectures, labs and a final project",
+            "user_id": str(ObjectId()),
+            "created_at": datetime.utcnow(),
+        }
+        for i in range(count)
+    ]
+
+def _json_request():
+    from starlette.requests import Request
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [(b"accept", b"application/json")]})
+
+# Response construction
+
+@benchmark("response.assignment_page_100")
+def _bench_assignment_page():
+    from backend.serialization import serialize_assignment, render
+    documents = _assignment_documents(100)
+    request = _json_request()
+    return lambda: render(request, [serialize_assignment(d, course_name="Calculus") for d in documents]).body
+
+@benchmark("response.schedule_page_100")
+def _bench_schedule_page():
+    from backend.serialization import serialize_schedule, render
+    documents = _schedule_documents(100)
+    request = _json_request()
+    return lambda: render(request, [serialize_schedule(d, course_name="Calculus") for d in documents]).body
+
+@benchmark("response.course_page_20")
+def _bench_course_page():
+    from backend.serialization import serialize_course, render
+    documents = _course_documents(20)
+    request = _json_request()
+    return lambda: render(request, [serialize_course(d) for d in documents]).body
+
+@benchmark("response.assignment_single")
+def _bench_assignment_single():
+    from backend.serialization import serialize_assignment, render
+    document = _assignment_documents(1)[0]
+    request = _json_request()
+    return lambda: render(request, serialize_assignment(document, course_name="Calculus")).body
+
+# Authentication
+
+def _token_and_user():
+    from backend.auth import create_user_access_token
+    user = {"_id": ObjectId(), "email": "student@example.com", "full_name": "Student", "token_version": 0}
+    return create_user_access_token(user, expires_delta=timedelta(hours=1)), user
+
+@benchmark("auth.jwt_decode_cold")
+def _bench_jwt_decode_cold():
+    from backend.auth import _decode_token, _verified_tokens
+    token, _ = _token_and_user()
+
+    def run():
+        _verified_tokens.pop(token)
+        return _decode_token(token)
+    return run
+
+@benchmark("auth.jwt_decode_cached")
+def _bench_jwt_decode_cached():
+    from backend.auth import _decode_token
+    token, _ = _token_and_user()
+    _decode_token(token)
+    return lambda: _decode_token(token)
+
+@benchmark("auth.get_current_user_cached")
+def _bench_get_current_user():
+    from backend.auth import get_current_user, _user_cache
+    token, user = _token_and_user()
+    _user_cache.set(str(user["_id"]), user)
+
+    async def run():
+        return await get_current_user(token)
+    return run
+
+# Chat prompt
+
+def _chat_context_documents():
+    now = datetime.utcnow()
+    courses = [
+        {"_id": ObjectId(), "course_name": f"Course {i}", "course_code": f"CS{100 + i}", "instructor": f"Dr. {i}"}
+        for i in range(6)
+    ]
+    assignments = [
+        {"_id": ObjectId(), "title": f"Problem set {i}", "course_id": str(ObjectId()),
+         "due_date": now + timedelta(days=i), "priority": "high"}
+        for i in range(10)
+    ]
+    schedules = [
+        {"_id": ObjectId(), "title": f"Lecture {i}", "start_time": now + timedelta(days=i),
+         "end_time": now + timedelta(days=i, hours=1), "location": f"Room {i}"}
+        for i in range(10)
+    ]
+    return courses, assignments, schedules
+
+@benchmark("chat.format_user_context")
+def _bench_format_user_context():
+    from backend.ai_chatbot import _format_user_context
+    courses, assignments, schedules = _chat_context_documents()
+    return lambda: _format_user_context(courses, assignments, schedules)
+
+@benchmark("chat.system_prompt")
+def _bench_system_prompt():
+    from backend.ai_chatbot import chatbot, _format_user_context
+    context = _format_user_context(*_chat_context_documents())
+    summary = "The student is behind on the physics lab report and wants to finish it before Friday. " * 3
+    return lambda: chatbot._create_system_prompt(context, summary)
+
+# Email rendering
+
+@benchmark("email.render_assignment_notification")
+def _bench_render_assignment_notification():
+    from backend.email_service import render_assignment_notification
+    due_date = datetime.utcnow() + timedelta(days=3)
+    return lambda: render_assignment_notification("Problem set 4", "Calculus", due_date)
+
+@benchmark("email.render_assignment_reminder")
+def _bench_render_assignment_reminder():
+    from backend.email_service import render_assignment_reminder
+    due_date = datetime.utcnow() + timedelta(days=2)
+    return lambda: render_assignment_reminder("Problem set 4", "Calculus", due_date)
+
+@benchmark("email.render_digest_10")
+def _bench_render_digest():
+    from backend.email_service import render_assignment_notification, render_assignment_reminder
+    from backend.email_digest import render_digest, KIND_NEW_ASSIGNMENT, KIND_REMINDER
+    due_date = datetime.utcnow() + timedelta(days=2)
+    items = []
+    for i in range(10):
+        kind = KIND_REMINDER if i % 2 else KIND_NEW_ASSIGNMENT
+        render = render_assignment_reminder if i % 2 else render_assignment_notification
+        subject, body = render(f"Problem set {i}", "Calculus", due_date)
+        items.append({"kind": kind, "subject": subject, "body": body})
+    return lambda: render_digest(items)
+
+@benchmark("email.build_message")
+def _bench_build_message():
+    from backend.email_service import build_email_message, render_assignment_reminder
+    subject, body = render_assignment_reminder("Problem set 4", "Calculus", datetime.utcnow())
+    return lambda: build_email_message("student@example.com", subject, body).as_bytes()
+
+# Reminder job
+
+@benchmark("reminders.render_batch_500")
+def _bench_render_reminders():
+    from backend.scheduler import _render_reminders
+    batch = [
+        {
+            "_id": d["_id"],
+            "title": d["title"],
+            "due_date": d["due_date"],
+            "course_name": "Calculus",
+            "email": f"student{i}@example.com",
+            "email_digest": i % 4 != 0,
+        }
+        for i, d in enumerate(_assignment_documents(500))
+    ]
+    return lambda: _render_reminders(batch)
+
+# Cold start
+
+@benchmark("startup.import_backend_main")
+def _bench_import_main():
+    from backend.benchmarks.importtime import REPO_ROOT
+    command = [sys.executable, "-c", "import backend.main"]
+    # A fresh interpreter per call; the first run also writes bytecode caches
+    subprocess.run(command, cwd=REPO_ROOT, check=True, capture_output=True)
+    return lambda: subprocess.run(command, cwd=REPO_ROOT, check=True, capture_output=True)
+
+# Measurement
+
+def _measure_sync(func: Callable, rounds: int) -> Tuple[List[float], int]:
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_ROUND_SECONDS:
+            break
+        loops *= 2
+    timings = [elapsed / loops]
+    for _ in range(rounds - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        timings.append((time.perf_counter() - started) / loops)
+    return timings, loops
+
+async def _measure_async(func: Callable, rounds: int) -> Tuple[List[float], int]:
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            await func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_ROUND_SECONDS:
+            break
+        loops *= 2
+    timings = [elapsed / loops]
+    for _ in range(rounds - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            await func()
+        timings.append((time.perf_counter() - started) / loops)
+    return timings, loops
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def run_suite(pattern: Optional[str] = None, rounds: int = 7) -> dict:
+    """Run the selected benchmarks and return a baseline document"""
+    results = {}
+    skipped = {}
+    for name, factory in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        try:
+            func = factory()
+        except Exception as e:
+            skipped[name] = f"{type(e).__name__}: {e}"
+            print(f"{name:<42} {'skipped':>12}  ({skipped[name]})")
+            continue
+        if inspect.iscoroutinefunction(func):
+            timings, loops = asyncio.run(_measure_async(func, rounds))
+        else:
+            timings, loops = _measure_sync(func, rounds)
+        results[name] = {
+            "median_us": round(statistics.median(timings) * 1e6, 3),
+            "min_us": round(min(timings) * 1e6, 3),
+            "stdev_us": round(statistics.stdev(timings) * 1e6, 3) if len(timings) > 1 else 0.0,
+            "loops": loops,
+            "rounds": rounds,
+        }
+        print(f"{name:<42} {results[name]['median_us']:>12.2f} us  (min {results[name]['min_us']:.2f}, {loops} loops x {rounds})")
+    return {
+        "version": BASELINE_VERSION,
+        "created_at": datetime.utcnow().isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} {platform.node()}",
+        "results": results,
+        "skipped": skipped,
+    }
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Print a comparison table and return the names of regressed benchmarks"""
+    regressions = []
+    print(f"{'benchmark':<42} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name in sorted(set(baseline["results"]) | set(current["results"])):
+        before = baseline["results"].get(name)
+        after = current["results"].get(name)
+        if before is None or after is None:
+            if before is None:
+                state = "new"
+            else:
+                state = "skipped" if name in current.get("skipped", {}) else "missing"
+            print(f"{name:<42} {'-' if before is None else before['median_us']:>12} {'-' if after is None else after['median_us']:>12} {state:>8}")
+            continue
+        change = after["median_us"] / before["median_us"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{name:<42} {before['median_us']:>12.2f} {after['median_us']:>12.2f} {change:>+8.1%}{flag}")
+    if baseline.get("machine") != current.get("machine"):
+        print(f"\nwarning: baseline was recorded on {baseline.get('machine')}, not {current.get('machine')}")
+    return regressions
+
+def _load(path: str) -> dict:
+    with open(path) as f:
+        document = json.load(f)
+    if document.get("version") != BASELINE_VERSION:
+        raise SystemExit(f"{path}: unsupported baseline version {document.get('version')}")
+    return document
+
+def _save(document: dict, path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Saved {len(document['results'])} results to {path}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the suite, optionally saving a baseline")
+    run_parser.add_argument("--save", help="write the results to this JSON file")
+
+    compare_parser = commands.add_parser("compare", help="compare against a baseline; exits 1 on regression")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current", nargs="?", help="results file; runs the suite when omitted")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown (0.10 = 10%%)")
+    compare_parser.add_argument("--save", help="also write the fresh results to this JSON file")
+
+    for command in (run_parser, compare_parser):
+        command.add_argument("-k", dest="pattern", help="only benchmarks whose name contains this")
+        command.add_argument("--rounds", type=int, default=7)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        document = run_suite(args.pattern, args.rounds)
+        if args.save:
+            _save(document, args.save)
+        return 0
+
+    baseline = _load(args.baseline)
+    if args.current:
+        current = _load(args.current)
+    else:
+        current = run_suite(args.pattern, args.rounds)
+        if args.save:
+            _save(current, args.save)
+        print()
+    if args.pattern:
+        baseline["results"] = {k: v for k, v in baseline["results"].items() if args.pattern in k}
+        current["results"] = {k: v for k, v in current["results"].items() if args.pattern in k}
+    if current.get("skipped"):
+        print(f"{len(current['skipped'])} benchmark(s) skipped, not compared: {', '.join(current['skipped'])}\n")
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"\nNo regressions over {args.threshold:.0%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
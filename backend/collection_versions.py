@@ -0,0 +1,74 @@
+import hashlib
+from typing import Callable, Iterable, List, Optional, Tuple
+from fastapi import Request, Response
+
+# Browsers may store the response but must revalidate it with If-None-Match
+CACHE_CONTROL = "private, no-cache"
+# Responses differ per user, so shared caches and browsers must key them on the token
+VARY = "Authorization"
+
+# In-process callbacks told about every version bump, e.g. to drop derived caches
+_bump_listeners: List[Callable[[str, Tuple[str, ...]], None]] = []
+
+def on_version_bump(listener: Callable[[str, Tuple[str, ...]], None]) -> Callable[[str, Tuple[str, ...]], None]:
+    """Register `listener(user_id, collections)` to run after each bump_version"""
+    _bump_listeners.append(listener)
+    return listener
+
+async def bump_version(db, user_id: str, *collections: str) -> None:
+    """Atomically increment the user's version counter for each collection"""
+    await db.collection_versions.update_one(
+        {"_id": user_id},
+        {"$inc": {name: 1 for name in collections}},
+        upsert=True
+    )
+    for listener in _bump_listeners:
+        listener(user_id, collections)
+
+async def get_versions(db, user_id: str, session=None) -> dict:
+    return await db.collection_versions.find_one({"_id": user_id}, session=session) or {}
+
+def make_etag(request: Request, user_id: str, versions: dict, collections: Iterable[str]) -> str:
+    """Weak ETag over the user, their collection versions and everything that shapes the response"""
+    parts = [user_id]
+    parts.extend(f"{name}={versions.get(name, 0)}" for name in collections)
+    parts.append(request.url.path)
+    parts.append(request.url.query)
+    parts.append(request.headers.get("accept", ""))
+    digest = hashlib.sha1("|".join(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or etag in candidates or etag[2:] in candidates
+
+async def conditional_get(
+    request: Request,
+    response: Response,
+    db,
+    user_id: str,
+    collections: Iterable[str],
+    session=None,
+) -> Optional[Response]:
+    """Answer If-None-Match from the version counters alone.
+
+    Returns a 304 response when the client's copy is current. Otherwise sets
+    ETag, Cache-Control and Vary on `response` and returns None, and the
+    caller goes on to run its query. List routes read the versions on the
+    primary in the request's causal session, so a body read afterwards in
+    the same session includes every write the ETag counts.
+    """
+    versions = await get_versions(db, user_id, session)
+    etag = make_etag(request, user_id, versions, collections)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": VARY}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+def cache_headers(response: Response) -> dict:
+    """The validator headers set by conditional_get, for responses built separately"""
+    return {name: response.headers[name] for name in ("ETag", "Cache-Control", "Vary") if name in response.headers}
@@ -1,9 +1,24 @@
 import os
-from dotenv import load_dotenv
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
-# Load environment variables from .env file if it exists
-load_dotenv()
+def _find_dotenv() -> Optional[str]:
+    """The nearest .env at or above this package, where python-dotenv would look"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        candidate = os.path.join(directory, ".env")
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+# Load environment variables from .env file if it exists; deployments configure
+# the environment directly, so python-dotenv is only imported when there is one
+_dotenv_path = _find_dotenv()
+if _dotenv_path:
+    from dotenv import load_dotenv
+    load_dotenv(_dotenv_path)
 
 class Settings:
     def __init__(self):
@@ -17,13 +32,73 @@ class Settings:
         )
         self.DATABASE_NAME: str = os.getenv("DATABASE_NAME", "student_management")
         
+        # MongoDB connection pool (per process); MONGO_MIN_POOL_SIZE connections are opened at startup
+        self.MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", 50))
+        self.MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", 5))
+        self.MONGO_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 300000))
+        self.MONGO_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 10000))
+        self.MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 10000))
+        self.MONGO_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 10000))
+        self.MONGO_SOCKET_TIMEOUT_MS: int = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 30000))
+        # Wire compression, in order of preference: any of "zstd", "snappy", "zlib" (empty disables it)
+        self.MONGO_COMPRESSORS: str = os.getenv("MONGO_COMPRESSORS", "")
+        self.MONGO_ZLIB_COMPRESSION_LEVEL: int = int(os.getenv("MONGO_ZLIB_COMPRESSION_LEVEL", -1))
+        # Stale-tolerant reads (lists, chat context, reminder scan) go to secondaries that lag the
+        # primary by at most MONGO_MAX_STALENESS_SECONDS (the server's minimum is 90)
+        self.MONGO_SECONDARY_READS: bool = os.getenv("MONGO_SECONDARY_READS", "true").lower() in ("1", "true", "yes")
+        self.MONGO_MAX_STALENESS_SECONDS: int = max(90, int(os.getenv("MONGO_MAX_STALENESS_SECONDS", 90)))
+        # How long a list read waits for a secondary to catch up with the versions read on the primary
+        # before it is answered from the primary instead
+        self.MONGO_SECONDARY_WAIT_MS: int = int(os.getenv("MONGO_SECONDARY_WAIT_MS", 2000))
+        
         # JWT Configuration
         self.SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
         self.ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
         self.ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
         
+        # Authentication caches (token revocation propagates across instances within the TTL)
+        self.AUTH_CACHE_TTL_SECONDS: int = int(os.getenv("AUTH_CACHE_TTL_SECONDS", 60))
+        self.AUTH_USER_CACHE_SIZE: int = int(os.getenv("AUTH_USER_CACHE_SIZE", 10000))
+        self.AUTH_TOKEN_CACHE_SIZE: int = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 10000))
+        
+        # List pagination
+        self.DEFAULT_PAGE_SIZE: int = int(os.getenv("DEFAULT_PAGE_SIZE", 100))
+        self.MAX_PAGE_SIZE: int = int(os.getenv("MAX_PAGE_SIZE", 500))
+        self.STREAM_BATCH_SIZE: int = int(os.getenv("STREAM_BATCH_SIZE", 200))
+        
+        # Password hashing
+        self.BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", 12))
+        self.PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+        
         # OpenAI Configuration
         self.OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
+        self.CHAT_CONTEXT_CACHE_TTL_SECONDS: int = int(os.getenv("CHAT_CONTEXT_CACHE_TTL_SECONDS", 120))
+        self.CHAT_CONTEXT_CACHE_SIZE: int = int(os.getenv("CHAT_CONTEXT_CACHE_SIZE", 5000))
+        self.SSE_HEARTBEAT_SECONDS: float = float(os.getenv("SSE_HEARTBEAT_SECONDS", 15))
+        # Import LangChain in the background after startup instead of on the first chat request
+        self.CHAT_PRELOAD: bool = os.getenv("CHAT_PRELOAD", "true").lower() in ("1", "true", "yes")
+        
+        # Chat response cache: "memory" (per process), "mongo" (shared) or "none"
+        self.CHAT_CACHE_BACKEND: str = os.getenv("CHAT_CACHE_BACKEND", "memory")
+        self.CHAT_CACHE_TTL_SECONDS: int = int(os.getenv("CHAT_CACHE_TTL_SECONDS", 600))
+        self.CHAT_CACHE_SIZE: int = int(os.getenv("CHAT_CACHE_SIZE", 2000))
+        self.CHAT_CACHE_MAX_RESPONSE_CHARS: int = int(os.getenv("CHAT_CACHE_MAX_RESPONSE_CHARS", 8000))
+        
+        # Model calls: concurrency limit, bounded wait queue, deadline and retries
+        self.CHAT_LLM_CONCURRENCY: int = int(os.getenv("CHAT_LLM_CONCURRENCY", 8))
+        self.CHAT_LLM_QUEUE_SIZE: int = int(os.getenv("CHAT_LLM_QUEUE_SIZE", 32))
+        self.CHAT_LLM_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("CHAT_LLM_QUEUE_TIMEOUT_SECONDS", 10))
+        self.CHAT_LLM_TIMEOUT_SECONDS: float = float(os.getenv("CHAT_LLM_TIMEOUT_SECONDS", 30))
+        self.CHAT_LLM_MAX_RETRIES: int = int(os.getenv("CHAT_LLM_MAX_RETRIES", 2))
+        self.CHAT_LLM_RETRY_BASE_SECONDS: float = float(os.getenv("CHAT_LLM_RETRY_BASE_SECONDS", 0.5))
+        self.CHAT_LLM_RETRY_AFTER_SECONDS: int = int(os.getenv("CHAT_LLM_RETRY_AFTER_SECONDS", 5))
+        
+        # Chat history: recent turns are resent verbatim up to the token budget,
+        # older ones are folded into a rolling summary
+        self.CHAT_HISTORY_TOKEN_BUDGET: int = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", 1500))
+        self.CHAT_HISTORY_MAX_MESSAGES: int = int(os.getenv("CHAT_HISTORY_MAX_MESSAGES", 40))
+        self.CHAT_HISTORY_CAPPED_BYTES: int = int(os.getenv("CHAT_HISTORY_CAPPED_BYTES", 256 * 1024 * 1024))
+        self.CHAT_SUMMARY_MAX_WORDS: int = int(os.getenv("CHAT_SUMMARY_MAX_WORDS", 200))
         
         # SMTP Configuration
         self.SMTP_HOST: str = os.getenv("SMTP_HOST", "smtp.gmail.com")
@@ -31,14 +106,51 @@ class Settings:
         self.SMTP_USER: str = os.getenv("SMTP_USER", "")
         self.SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD", "")
         self.EMAIL_FROM: str = os.getenv("EMAIL_FROM", "")
+        self.SMTP_START_TLS: bool = os.getenv("SMTP_START_TLS", "true").lower() in ("1", "true", "yes")
+        self.SMTP_POOL_SIZE: int = int(os.getenv("SMTP_POOL_SIZE", 4))
+        self.SMTP_IDLE_TIMEOUT_SECONDS: float = float(os.getenv("SMTP_IDLE_TIMEOUT_SECONDS", 120))
+        self.SMTP_KEEPALIVE_SECONDS: float = float(os.getenv("SMTP_KEEPALIVE_SECONDS", 45))
+        self.SMTP_MAX_MESSAGES_PER_CONNECTION: int = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", 100))
+        
+        # Email outbox
+        self.EMAIL_WORKERS: int = int(os.getenv("EMAIL_WORKERS", 4))
+        self.EMAIL_RATE_PER_SECOND: float = float(os.getenv("EMAIL_RATE_PER_SECOND", 5))
+        self.EMAIL_RATE_BURST: int = int(os.getenv("EMAIL_RATE_BURST", 10))
+        self.EMAIL_MAX_ATTEMPTS: int = int(os.getenv("EMAIL_MAX_ATTEMPTS", 6))
+        self.EMAIL_RETRY_BASE_SECONDS: float = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", 30))
+        self.EMAIL_RETRY_MAX_SECONDS: float = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", 3600))
+        self.EMAIL_LOCK_SECONDS: int = int(os.getenv("EMAIL_LOCK_SECONDS", 300))
+        self.EMAIL_POLL_INTERVAL_SECONDS: float = float(os.getenv("EMAIL_POLL_INTERVAL_SECONDS", 5))
+        
+        # Email digests (users can opt out to immediate delivery)
+        self.EMAIL_DIGEST_DEFAULT: bool = os.getenv("EMAIL_DIGEST_DEFAULT", "true").lower() in ("1", "true", "yes")
+        self.EMAIL_DIGEST_WINDOW_MINUTES: float = float(os.getenv("EMAIL_DIGEST_WINDOW_MINUTES", 30))
+        self.EMAIL_DIGEST_FLUSH_INTERVAL_SECONDS: int = int(os.getenv("EMAIL_DIGEST_FLUSH_INTERVAL_SECONDS", 60))
+        self.EMAIL_DIGEST_FLUSH_BATCH_SIZE: int = int(os.getenv("EMAIL_DIGEST_FLUSH_BATCH_SIZE", 500))
+        
+        # Reminders: "events" fires per-assignment reminder events as they come due,
+        # "scan" keeps the twice-daily scan of the next 49 hours
+        self.REMINDER_DISPATCH: str = os.getenv("REMINDER_DISPATCH", "events")
+        self.REMINDER_HORIZONS_HOURS: List[float] = [
+            float(hours) for hours in os.getenv("REMINDER_HORIZONS_HOURS", "168,48,2").split(",") if hours.strip()
+        ]
+        self.REMINDER_MAX_SLEEP_SECONDS: float = float(os.getenv("REMINDER_MAX_SLEEP_SECONDS", 60))
+        self.REMINDER_BATCH_SIZE: int = int(os.getenv("REMINDER_BATCH_SIZE", 500))
+        self.REMINDER_CONCURRENCY: int = int(os.getenv("REMINDER_CONCURRENCY", 4))
+        # A failed scan is retried within the same firing, with the delay doubling between attempts
+        self.REMINDER_RUN_ATTEMPTS: int = int(os.getenv("REMINDER_RUN_ATTEMPTS", 3))
+        self.REMINDER_RETRY_DELAY_SECONDS: float = float(os.getenv("REMINDER_RETRY_DELAY_SECONDS", 30))
+        
+        # Multi-instance scheduling
+        self.REMINDER_SHARDING: bool = os.getenv("REMINDER_SHARDING", "false").lower() in ("1", "true", "yes")
+        self.SCHEDULER_LEASE_SECONDS: int = int(os.getenv("SCHEDULER_LEASE_SECONDS", 900))
+        self.INSTANCE_HEARTBEAT_SECONDS: int = int(os.getenv("INSTANCE_HEARTBEAT_SECONDS", 15))
+        self.INSTANCE_TIMEOUT_SECONDS: int = int(os.getenv("INSTANCE_TIMEOUT_SECONDS", 45))
         
         # Environment
         self.ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
-        
-        # Print configuration for debugging
-        self._print_config()
     
-    def _print_config(self) -> None:
+    def print_config(self) -> None:
         """Print configuration details (hiding sensitive information)."""
         print(" Application Configuration:")
         print(f"- Environment: {self.ENVIRONMENT}")
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, List, Set, Tuple
+from backend.config import settings
+from backend.database import get_database
+from backend.indexes import ensure_capped
+
+logger = logging.getLogger(__name__)
+
+ROLE_USER = "user"
+ROLE_ASSISTANT = "assistant"
+
+# (previous summary, [(role, content), ...]) -> new summary
+Summarizer = Callable[[str, List[Tuple[str, str]]], Awaitable[str]]
+
+# tiktoken is imported on first use so it stays off the startup path; False when it is not
+# installed or its encoding file cannot be downloaded
+_encoding = None
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
+        except Exception as e:
+            logger.warning(f"⚠️ tiktoken unavailable, estimating token counts: {e}")
+            _encoding = False
+    return _encoding
+
+async def load_encoding() -> None:
+    """Resolve the encoding in a worker thread; the first load may download it"""
+    if _encoding is None:
+        await asyncio.to_thread(_get_encoding)
+
+def count_tokens(text: str) -> int:
+    """Token count for the chat model, or a 4-characters-per-token estimate without tiktoken"""
+    encoding = _get_encoding()
+    if not encoding:
+        return len(text) // 4 + 1
+    # Roughly 4 tokens of per-message framing in the chat format
+    return len(encoding.encode(text)) + 4
+
+class ConversationMemory:
+    """Per-user chat history kept in the capped chat_messages collection.
+
+    Each user has a rolling summary in chat_summaries covering every message
+    up to `until`; only messages after it are ever sent verbatim. Turns are
+    written in the background after the reply, and once the unsummarized
+    tail outgrows the token budget its older half is folded into the summary.
+    """
+
+    def __init__(self):
+        self._pending: Set[asyncio.Task] = set()
+        self._compacting: Set[str] = set()
+        # chat_messages must be created capped before the first insert, which would create it uncapped
+        self._capped_ready = False
+
+    async def load(self, user_id: str) -> Tuple[str, List[Tuple[str, str]]]:
+        """The rolling summary and the newest messages that fit in the history budget"""
+        await load_encoding()
+        db = await get_database()
+        summary_doc = await db.chat_summaries.find_one({"_id": user_id}) or {}
+        query = {"user_id": user_id}
+        if summary_doc.get("until") is not None:
+            query["_id"] = {"$gt": summary_doc["until"]}
+        recent = await db.chat_messages.find(
+            query, {"role": 1, "content": 1, "tokens": 1}
+        ).sort("_id", -1).limit(settings.CHAT_HISTORY_MAX_MESSAGES).to_list(length=None)
+
+        budget = settings.CHAT_HISTORY_TOKEN_BUDGET - count_tokens(summary_doc.get("summary", ""))
+        messages = []
+        for message in recent:
+            budget -= message["tokens"]
+            if budget < 0:
+                break
+            messages.append((message["role"], message["content"]))
+        messages.reverse()
+        return summary_doc.get("summary", ""), messages
+
+    def record_turn(self, user_id: str, message: str, reply: str, summarize: Summarizer) -> None:
+        """Persist a finished turn without delaying the response"""
+        task = asyncio.create_task(self._record(user_id, message, reply, summarize))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _record(self, user_id: str, message: str, reply: str, summarize: Summarizer) -> None:
+        try:
+            await load_encoding()
+            db = await get_database()
+            if not self._capped_ready:
+                await ensure_capped(db)
+                self._capped_ready = True
+            now = datetime.utcnow()
+            await db.chat_messages.insert_many([
+                {"user_id": user_id, "role": role, "content": content, "tokens": count_tokens(content), "created_at": now}
+                for role, content in ((ROLE_USER, message), (ROLE_ASSISTANT, reply))
+            ])
+            if user_id not in self._compacting:
+                self._compacting.add(user_id)
+                try:
+                    await self._compact(db, user_id, summarize)
+                finally:
+                    self._compacting.discard(user_id)
+        except Exception as e:
+            logger.error(f"⚠️ Could not save chat history for {user_id}: {e}")
+
+    async def _compact(self, db, user_id: str, summarize: Summarizer) -> None:
+        """Fold the older half of an over-budget history into the rolling summary"""
+        summary_doc = await db.chat_summaries.find_one({"_id": user_id}) or {}
+        query = {"user_id": user_id}
+        if summary_doc.get("until") is not None:
+            query["_id"] = {"$gt": summary_doc["until"]}
+        unsummarized = await db.chat_messages.find(
+            query, {"role": 1, "content": 1, "tokens": 1}
+        ).sort("_id", 1).to_list(length=None)
+        if sum(message["tokens"] for message in unsummarized) <= settings.CHAT_HISTORY_TOKEN_BUDGET:
+            return
+
+        # Keep the newest messages that fit in half the budget verbatim
+        keep, kept_tokens = len(unsummarized), 0
+        while keep > 0 and kept_tokens + unsummarized[keep - 1]["tokens"] <= settings.CHAT_HISTORY_TOKEN_BUDGET // 2:
+            keep -= 1
+            kept_tokens += unsummarized[keep]["tokens"]
+        older = unsummarized[:keep]
+        if not older:
+            return
+
+        summary = await summarize(
+            summary_doc.get("summary", ""),
+            [(message["role"], message["content"]) for message in older]
+        )
+        await db.chat_summaries.update_one(
+            {"_id": user_id},
+            {"$set": {"summary": summary, "until": older[-1]["_id"], "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        logger.info(f"🗜️ Compacted {len(older)} chat messages for {user_id}")
+
+    async def clear(self, user_id: str) -> None:
+        """Forget a user's conversation; capped collections keep the documents until they roll off"""
+        db = await get_database()
+        latest = await db.chat_messages.find_one({"user_id": user_id}, {"_id": 1}, sort=[("_id", -1)])
+        await db.chat_summaries.update_one(
+            {"_id": user_id},
+            {"$set": {"summary": "", "until": latest["_id"] if latest else None, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def close(self) -> None:
+        """Wait for history writes still in flight"""
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+# Create a singleton instance
+conversation_memory = ConversationMemory()
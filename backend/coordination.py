@@ -0,0 +1,108 @@
+import logging
+import os
+import socket
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from typing import List, Optional
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process in leases and heartbeats
+INSTANCE_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+# Assignments carry a stable bucket derived from user_id; scans are split with $mod on it
+USER_BUCKETS = 1024
+
+def user_bucket(user_id: str) -> int:
+    return zlib.crc32(user_id.encode()) % USER_BUCKETS
+
+def shard_filter(shard: int, shards: int) -> dict:
+    """Query filter selecting one shard's share of assignments"""
+    if shards <= 1:
+        return {}
+    in_shard = {"user_bucket": {"$mod": [shards, shard]}}
+    if shard == 0:
+        # Assignments created before buckets existed belong to the first shard
+        return {"$or": [in_shard, {"user_bucket": {"$exists": False}}]}
+    return in_shard
+
+async def acquire_lease(db, name: str, ttl_seconds: Optional[float] = None) -> bool:
+    """Try to become the holder of a named lease.
+
+    Succeeds when the lease is new, expired, or already held by this
+    instance, and not yet marked done. Losing the race to another instance
+    surfaces as a duplicate key on the upsert.
+    """
+    now = datetime.utcnow()
+    ttl = ttl_seconds or settings.SCHEDULER_LEASE_SECONDS
+    try:
+        await db.scheduler_leases.find_one_and_update(
+            {
+                "_id": name,
+                "done": {"$ne": True},
+                "$or": [{"expires_at": {"$lte": now}}, {"holder": INSTANCE_ID}],
+            },
+            {
+                "$set": {"holder": INSTANCE_ID, "expires_at": now + timedelta(seconds=ttl)},
+                "$setOnInsert": {"created_at": now},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+async def complete_lease(db, name: str) -> None:
+    """Mark a lease's work as finished so no other instance repeats it"""
+    await db.scheduler_leases.update_one(
+        {"_id": name, "holder": INSTANCE_ID},
+        {"$set": {"done": True, "finished_at": datetime.utcnow()}}
+    )
+
+async def release_lease(db, name: str) -> None:
+    """Give up a lease without completing it, letting another instance take over"""
+    await db.scheduler_leases.update_one(
+        {"_id": name, "holder": INSTANCE_ID, "done": {"$ne": True}},
+        {"$set": {"expires_at": datetime.utcnow()}}
+    )
+
+async def firing_members(db, firing: str, instances: List[str]) -> List[str]:
+    """The instances a firing is split across, fixed by the first instance to ask.
+
+    Every instance shards the firing with this one snapshot, so instances
+    joining or leaving while it runs cannot produce leases for differently
+    sized shards that each cover everything.
+    """
+    snapshot = {"_id": firing, "created_at": datetime.utcnow(), "instances": instances}
+    try:
+        await db.scheduler_leases.insert_one(snapshot)
+        return instances
+    except DuplicateKeyError:
+        existing = await db.scheduler_leases.find_one({"_id": firing}, {"instances": 1})
+        return existing["instances"]
+
+async def heartbeat(db) -> None:
+    """Record that this instance is alive and able to take scheduler work"""
+    await db.scheduler_instances.update_one(
+        {"_id": INSTANCE_ID},
+        {"$set": {"heartbeat_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+async def deregister(db) -> None:
+    await db.scheduler_instances.delete_one({"_id": INSTANCE_ID})
+
+async def healthy_instances(db) -> List[str]:
+    """Ids of instances with a recent heartbeat, in a stable order"""
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.INSTANCE_TIMEOUT_SECONDS)
+    cursor = db.scheduler_instances.find({"heartbeat_at": {"$gte": cutoff}}, {"_id": 1}).sort("_id", ASCENDING)
+    instances = [doc["_id"] async for doc in cursor]
+    # Include ourselves even if our first heartbeat has not landed yet
+    if INSTANCE_ID not in instances:
+        instances = sorted(instances + [INSTANCE_ID])
+    return instances
@@ -0,0 +1,38 @@
+from bson import ObjectId
+from typing import Dict, Iterable, Optional
+
+UNKNOWN_COURSE = "Unknown Course"
+
+def _to_object_ids(course_ids: Iterable) -> list:
+    """Collect the distinct, valid ObjectIds from a mix of str/ObjectId ids"""
+    object_ids = set()
+    for course_id in course_ids:
+        if not course_id:
+            continue
+        if isinstance(course_id, ObjectId):
+            object_ids.add(course_id)
+        elif ObjectId.is_valid(course_id):
+            object_ids.add(ObjectId(course_id))
+    return list(object_ids)
+
+async def resolve_course_names(db, course_ids: Iterable, user_id: Optional[str] = None, session=None) -> Dict[str, str]:
+    """Resolve course ids to course names with a single $in query.
+
+    Returns a mapping keyed by the string form of each course id that was
+    found. Ids that are missing or invalid are simply absent from the result.
+    """
+    object_ids = _to_object_ids(course_ids)
+    if not object_ids:
+        return {}
+
+    query = {"_id": {"$in": object_ids}}
+    if user_id is not None:
+        query["user_id"] = user_id
+
+    courses = await db.courses.find(query, {"course_name": 1}, session=session).to_list(length=len(object_ids))
+    return {str(course["_id"]): course["course_name"] for course in courses}
+
+async def resolve_course_name(db, course_id, user_id: Optional[str] = None) -> Optional[str]:
+    """Resolve a single course id to its name, or None if it cannot be found"""
+    names = await resolve_course_names(db, [course_id], user_id=user_id)
+    return names.get(str(course_id)) if course_id else None
@@ -1,14 +1,23 @@
 import asyncio
 import logging
 import os
-from motor.motor_asyncio import AsyncIOMotorClient
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
+import pymongo
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorClientSession
+from pymongo.errors import PyMongoError
+from pymongo.read_preferences import SecondaryPreferred
 from backend.config import settings
+from backend.pool_stats import pool_stats
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 class Database:
     client: AsyncIOMotorClient = None
     db = None
+    # Same database with reads routed to secondaries; None when secondary reads are off
+    secondary = None
     
 db = Database()
 
@@ -17,60 +26,121 @@ async def get_database():
         await connect_to_mongo()
     return db.db
 
+async def get_secondary_database():
+    """The database for reads that tolerate bounded staleness.
+    
+    Reads go to a secondary within MONGO_MAX_STALENESS_SECONDS of the primary,
+    or to the primary when no such secondary is available. Falls back to the
+    primary database when secondary reads are disabled.
+    """
+    if db.db is None:
+        await connect_to_mongo()
+    return db.secondary if db.secondary is not None else db.db
+
+async def read_session() -> AsyncIterator[Optional[AsyncIOMotorClientSession]]:
+    """Request-scoped causally consistent session, as a FastAPI dependency.
+    
+    Reads in the session see at least everything earlier reads in it saw, so
+    a secondary read after a primary read waits (afterClusterTime) until
+    that secondary has caught up. Yields None when secondary reads are off.
+    """
+    await get_secondary_database()
+    if db.secondary is None:
+        yield None
+        return
+    async with await db.client.start_session(causal_consistency=True) as session:
+        yield session
+
+async def read_caught_up(read: Callable[..., Awaitable[T]], session: Optional[AsyncIOMotorClientSession]) -> T:
+    """Run `read(database)` on a secondary caught up with the session, or on the primary.
+    
+    The secondary only answers once it has replicated everything the session
+    has seen. If that takes longer than MONGO_SECONDARY_WAIT_MS (a lagging
+    member), the read is repeated on the primary instead of stalling.
+    """
+    if session is None:
+        return await read(await get_secondary_database())
+    try:
+        with pymongo.timeout(settings.MONGO_SECONDARY_WAIT_MS / 1000):
+            return await read(db.secondary)
+    except PyMongoError as e:
+        if not e.timeout:
+            raise
+        logger.warning(f"⚠️ Secondary read did not catch up within {settings.MONGO_SECONDARY_WAIT_MS} ms; reading from the primary")
+        return await read(db.db)
+
+def client_options() -> dict:
+    """Client keyword arguments: timeouts, pool sizing and wire compression from settings"""
+    options = dict(
+        serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=settings.MONGO_SOCKET_TIMEOUT_MS,
+        maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        event_listeners=[pool_stats],
+        connect=False,  # Connect on first use instead of blocking here
+        retryWrites=True,
+        w='majority',
+        appName='student-planner-backend'
+    )
+    compressors = [name.strip() for name in settings.MONGO_COMPRESSORS.split(",") if name.strip()]
+    if compressors:
+        options["compressors"] = compressors
+        if "zlib" in compressors:
+            options["zlibCompressionLevel"] = settings.MONGO_ZLIB_COMPRESSION_LEVEL
+    return options
+
 async def connect_to_mongo():
+    """Create the client without any network round trip.
+    
+    Motor connects lazily on the first operation, so this never delays startup;
+    call ping_mongo to verify the connection.
+    """
+    # Get MongoDB URL from environment or settings
+    mongodb_url = os.getenv('MONGODB_URL') or os.getenv('MONGODB_URI') or settings.MONGODB_URL
+    
+    logger.info(f"🔧 Using MongoDB at: {mongodb_url.split('@')[-1]}")
     try:
-        max_retries = 3
-        retry_delay = 2  # seconds
-        
-        # Get MongoDB URL from environment or settings
-        mongodb_url = os.getenv('MONGODB_URL') or os.getenv('MONGODB_URI') or settings.MONGODB_URL
-        
-        logger.info(f"🔧 Attempting to connect to MongoDB with URL: {mongodb_url.split('@')[-1]}")
-        
-        for attempt in range(max_retries):
-            try:
-                logger.info(f"🔄 Attempt {attempt + 1}/{max_retries} to connect to MongoDB...")
-                
-                # Create a new client with explicit parameters
-                db.client = AsyncIOMotorClient(
-                    mongodb_url,
-                    serverSelectionTimeoutMS=10000,
-                    connectTimeoutMS=10000,
-                    socketTimeoutMS=30000,
-                    connect=False,  # Use connect=False to handle connection manually
-                    retryWrites=True,
-                    w='majority',
-                    appName='student-planner-backend'
-                )
-                
-                # Force connection and get server info
-                logger.info("🔍 Testing MongoDB connection...")
-                await db.client.admin.command('ping')
-                
-                # If we get here, connection was successful
-                db.db = db.client[settings.DATABASE_NAME]
-                logger.info(f"✅ Successfully connected to MongoDB: {settings.DATABASE_NAME}")
-                
-                # Verify we can access the database
-                collections = await db.db.list_collection_names()
-                logger.info(f"📚 Available collections: {', '.join(collections) if collections else 'None'}")
-                
-                return
-                
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    logger.error(f"❌ Failed to connect to MongoDB after {max_retries} attempts")
-                    logger.error(f"❌ Error details: {str(e)}")
-                    raise
-                    
-                logger.warning(f"⚠️ Attempt {attempt + 1} failed. Retrying in {retry_delay} seconds...")
-                await asyncio.sleep(retry_delay)
-                
+        db.client = AsyncIOMotorClient(mongodb_url, **client_options())
+        db.db = db.client[settings.DATABASE_NAME]
+        if settings.MONGO_SECONDARY_READS:
+            db.secondary = db.client.get_database(
+                settings.DATABASE_NAME,
+                read_preference=SecondaryPreferred(max_staleness=settings.MONGO_MAX_STALENESS_SECONDS)
+            )
     except Exception as e:
-        logger.error(f"❌ Critical error connecting to MongoDB: {str(e)}")
-        logger.error(f"❌ Connection was attempted with URL: {mongodb_url}")
+        logger.error(f"❌ Invalid MongoDB configuration: {str(e)}")
         raise
 
+async def ping_mongo(max_retries: int = 5, initial_delay: float = 0.25, max_delay: float = 5.0) -> None:
+    """Verify the connection, retrying with exponential backoff"""
+    delay = initial_delay
+    for attempt in range(max_retries):
+        try:
+            await db.client.admin.command('ping')
+            logger.info(f"✅ Successfully connected to MongoDB: {settings.DATABASE_NAME}")
+            return
+        except Exception as e:
+            if attempt == max_retries - 1:
+                logger.error(f"❌ Failed to connect to MongoDB after {max_retries} attempts: {str(e)}")
+                raise
+            logger.warning(f"⚠️ MongoDB ping attempt {attempt + 1} failed. Retrying in {delay:.2f} seconds...")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+async def warm_pool(size: int) -> int:
+    """Open up to `size` pooled connections with concurrent pings; returns the connections open.
+    
+    PyMongo also fills minPoolSize in the background, but only after its first
+    maintenance pass, so the first requests after a deploy would still pay for
+    new connections.
+    """
+    if size > 0:
+        await asyncio.gather(*(db.client.admin.command('ping') for _ in range(size)))
+    return pool_stats.open
+
 async def close_mongo_connection():
     if db.client:
         try:
@@ -81,3 +151,4 @@ async def close_mongo_connection():
         finally:
             db.client = None
             db.db = None
+            db.secondary = None
@@ -0,0 +1,120 @@
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from pymongo import ASCENDING
+from backend.config import settings
+from backend.database import get_database
+from backend.email_outbox import enqueue_email, enqueue_emails, insert_many_once, PRIORITY_TRANSACTIONAL
+
+logger = logging.getLogger(__name__)
+
+KIND_NEW_ASSIGNMENT = "new_assignment"
+KIND_NEW_SCHEDULE = "new_schedule"
+KIND_REMINDER = "reminder"
+
+# Digest sections, in the order they are rendered
+_SECTIONS = [
+    (KIND_REMINDER, "⏰ Due Soon"),
+    (KIND_NEW_ASSIGNMENT, "New Assignments"),
+    (KIND_NEW_SCHEDULE, "New Schedule Events"),
+]
+
+def wants_digest(user: Optional[dict]) -> bool:
+    """Whether a user's notifications are grouped into digests"""
+    if not user:
+        return settings.EMAIL_DIGEST_DEFAULT
+    return user.get("email_digest", settings.EMAIL_DIGEST_DEFAULT)
+
+def _digest_item(to_email: str, kind: str, subject: str, body: str, priority: int, now: datetime) -> dict:
+    return {
+        "to": to_email,
+        "kind": kind,
+        "subject": subject,
+        "body": body,
+        "priority": priority,
+        "created_at": now,
+        "flush_at": now + timedelta(minutes=settings.EMAIL_DIGEST_WINDOW_MINUTES),
+    }
+
+async def add_to_digest(to_email: str, kind: str, subject: str, body: str, priority: int = PRIORITY_TRANSACTIONAL) -> None:
+    """Hold a notification for the recipient's next digest"""
+    await add_many_to_digest([(to_email, kind, subject, body)], priority)
+
+async def add_many_to_digest(items: List[tuple], priority: int = PRIORITY_TRANSACTIONAL) -> None:
+    """Hold many (to_email, kind, subject, body[, dedupe_key]) notifications with a single insert.
+
+    An item whose dedupe_key is still held is dropped.
+    """
+    if not items:
+        return
+    db = await get_database()
+    now = datetime.utcnow()
+    documents = []
+    for to_email, kind, subject, body, *dedupe_key in items:
+        document = _digest_item(to_email, kind, subject, body, priority, now)
+        if dedupe_key:
+            document["dedupe_key"] = dedupe_key[0]
+        documents.append(document)
+    await insert_many_once(db.email_digest_items, documents)
+
+async def notify(user: dict, kind: str, subject: str, body: str, priority: int = PRIORITY_TRANSACTIONAL) -> None:
+    """Send a notification now or hold it for a digest, per the user's preference"""
+    if wants_digest(user):
+        await add_to_digest(user["email"], kind, subject, body, priority)
+    else:
+        await enqueue_email(user["email"], subject, body, priority)
+
+def render_digest(items: List[dict]) -> Tuple[str, str]:
+    """Build a single email from the held notifications of one recipient"""
+    if len(items) == 1:
+        return items[0]["subject"], items[0]["body"]
+
+    sections = []
+    for kind, heading in _SECTIONS:
+        bodies = [item["body"] for item in items if item["kind"] == kind]
+        if bodies:
+            entries = '<hr style="border: none; border-top: 1px dashed #e0e0e0;">'.join(bodies)
+            sections.append(f"<h2>{heading} ({len(bodies)})</h2>{entries}")
+    subject = f"Your Student Planner digest: {len(items)} updates"
+    return subject, "\n".join(sections)
+
+async def _due_recipients(db, now: datetime) -> List[str]:
+    """Recipients whose oldest unclaimed item has waited out the digest window"""
+    pipeline = [
+        {"$match": {"claimed_until": {"$not": {"$gt": now}}}},
+        {"$group": {"_id": "$to", "flush_at": {"$min": "$flush_at"}}},
+        {"$match": {"flush_at": {"$lte": now}}},
+        {"$limit": settings.EMAIL_DIGEST_FLUSH_BATCH_SIZE},
+    ]
+    return [group["_id"] async for group in db.email_digest_items.aggregate(pipeline)]
+
+async def _claim(db, to_email: str, now: datetime) -> List[dict]:
+    """Atomically take a recipient's held items so concurrent flushers never double-send"""
+    claim = uuid.uuid4().hex
+    await db.email_digest_items.update_many(
+        {"to": to_email, "claimed_until": {"$not": {"$gt": now}}},
+        {"$set": {"claim": claim, "claimed_until": now + timedelta(seconds=settings.EMAIL_LOCK_SECONDS)}}
+    )
+    return await db.email_digest_items.find({"claim": claim}).sort("created_at", ASCENDING).to_list(length=None)
+
+async def flush_due_digests() -> int:
+    """Render and queue one email per recipient with a due digest; returns emails queued"""
+    db = await get_database()
+    now = datetime.utcnow()
+    queued = 0
+
+    for to_email in await _due_recipients(db, now):
+        items = await _claim(db, to_email, now)
+        if not items:
+            continue
+        subject, body = render_digest(items)
+        priority = min(item["priority"] for item in items)
+        # Claimed items whose email was never queued are re-claimed once the lock expires
+        await enqueue_emails([(to_email, subject, body)], priority)
+        await db.email_digest_items.delete_many({"_id": {"$in": [item["_id"] for item in items]}})
+        queued += 1
+
+    if queued:
+        logger.info(f"📬 Queued {queued} digest emails")
+    return queued
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError
+from backend.config import settings
+from backend.database import get_database
+
+logger = logging.getLogger(__name__)
+
+# Lower values are delivered first
+PRIORITY_TRANSACTIONAL = 0
+PRIORITY_BULK = 1
+
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+# (to_email, subject, body) -> delivered?
+Sender = Callable[[str, str, str], Awaitable[bool]]
+
+# Duplicate key: a message with this dedupe_key was already queued
+_DUPLICATE_KEY = 11000
+
+async def insert_many_once(collection, documents: List[dict]) -> None:
+    """insert_many that skips documents whose dedupe_key is already present.
+
+    Lets a retried job re-queue everything it produced without sending
+    twice what the failed attempt had already queued.
+    """
+    try:
+        await collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        if any(error["code"] != _DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+            raise
+
+class TokenBucket:
+    """Async token bucket limiting sends to the SMTP provider's quota"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+class EmailOutbox:
+    """Durable outbox drained by a pool of in-process workers.
+
+    Messages are inserted into the email_outbox collection and claimed one at a
+    time with find_one_and_update, so several app instances can share the
+    queue. A message whose worker died mid-send is re-queued once its lock
+    expires.
+    """
+
+    def __init__(self):
+        self._sender: Optional[Sender] = None
+        self._bucket: Optional[TokenBucket] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def enqueue(self, to_email: str, subject: str, body: str, priority: int = PRIORITY_TRANSACTIONAL) -> None:
+        await self.enqueue_many([(to_email, subject, body)], priority)
+
+    async def enqueue_many(self, messages: List[tuple], priority: int = PRIORITY_TRANSACTIONAL) -> None:
+        """Queue (to_email, subject, body[, dedupe_key]) messages with a single insert.
+
+        A message whose dedupe_key was queued before is dropped.
+        """
+        if not messages:
+            return
+        db = await get_database()
+        now = datetime.utcnow()
+        documents = []
+        for to_email, subject, body, *dedupe_key in messages:
+            document = {
+                "to": to_email,
+                "subject": subject,
+                "body": body,
+                "priority": priority,
+                "status": STATUS_PENDING,
+                "attempts": 0,
+                "next_attempt_at": now,
+                "created_at": now,
+            }
+            if dedupe_key:
+                document["dedupe_key"] = dedupe_key[0]
+            documents.append(document)
+        await insert_many_once(db.email_outbox, documents)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self, sender: Sender) -> None:
+        self._sender = sender
+        self._bucket = TokenBucket(settings.EMAIL_RATE_PER_SECOND, settings.EMAIL_RATE_BURST)
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(index), name=f"email-outbox-{index}")
+            for index in range(settings.EMAIL_WORKERS)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _claim(self, db) -> Optional[dict]:
+        now = datetime.utcnow()
+        return await db.email_outbox.find_one_and_update(
+            {"status": STATUS_PENDING, "next_attempt_at": {"$lte": now}},
+            {"$set": {
+                "status": STATUS_SENDING,
+                "locked_until": now + timedelta(seconds=settings.EMAIL_LOCK_SECONDS),
+            }},
+            sort=[("priority", ASCENDING), ("next_attempt_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _requeue_stale(self, db) -> None:
+        """Return messages whose worker died mid-send to the queue"""
+        await db.email_outbox.update_many(
+            {"status": STATUS_SENDING, "locked_until": {"$lte": datetime.utcnow()}},
+            {"$set": {"status": STATUS_PENDING}}
+        )
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(settings.EMAIL_RETRY_MAX_SECONDS, settings.EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _deliver(self, db, message: dict) -> None:
+        await self._bucket.acquire()
+        try:
+            delivered = await self._sender(message["to"], message["subject"], message["body"])
+            error = None if delivered else "send_email reported failure"
+        except Exception as e:
+            delivered, error = False, str(e)
+
+        if delivered:
+            await db.email_outbox.update_one(
+                {"_id": message["_id"]},
+                {"$set": {"status": STATUS_SENT, "sent_at": datetime.utcnow()}, "$unset": {"locked_until": ""}}
+            )
+            return
+
+        attempts = message["attempts"] + 1
+        if attempts >= settings.EMAIL_MAX_ATTEMPTS:
+            logger.error(f"❌ Giving up on email to {message['to']} after {attempts} attempts: {error}")
+            update = {"status": STATUS_FAILED}
+        else:
+            update = {
+                "status": STATUS_PENDING,
+                "next_attempt_at": datetime.utcnow() + timedelta(seconds=self._backoff(attempts)),
+            }
+        await db.email_outbox.update_one(
+            {"_id": message["_id"]},
+            {"$set": {**update, "attempts": attempts, "last_error": error}, "$unset": {"locked_until": ""}}
+        )
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            try:
+                db = await get_database()
+                if index == 0:
+                    await self._requeue_stale(db)
+                message = await self._claim(db)
+                if message is not None:
+                    await self._deliver(db, message)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"⚠️ Email outbox worker {index} error: {e}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.EMAIL_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+# Create a singleton instance
+outbox = EmailOutbox()
+
+async def enqueue_email(to_email: str, subject: str, body: str, priority: int = PRIORITY_TRANSACTIONAL) -> None:
+    """Queue an email for background delivery and return immediately"""
+    await outbox.enqueue(to_email, subject, body, priority)
+
+async def enqueue_emails(messages: List[tuple], priority: int = PRIORITY_TRANSACTIONAL) -> None:
+    """Queue many (to_email, subject, body[, dedupe_key]) messages with a single insert"""
+    await outbox.enqueue_many(messages, priority)
@@ -0,0 +1,234 @@
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import CollectionInvalid, OperationFailure
+from backend.database import get_database, close_mongo_connection
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Declared indexes per collection. create_index is a no-op when an index with
+# the same name and spec already exists, so this is safe to run on every startup.
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "courses": [
+        IndexModel([("user_id", ASCENDING), ("_id", ASCENDING)], name="user_id_id"),
+    ],
+    "assignments": [
+        IndexModel([("user_id", ASCENDING), ("due_date", ASCENDING), ("_id", ASCENDING)], name="user_id_due_date_id"),
+        IndexModel(
+            [("due_date", ASCENDING)],
+            name="due_date_unsent_reminders",
+            partialFilterExpression={"completed": False, "reminder_sent": False},
+        ),
+        IndexModel([("reminder_claim", ASCENDING)], name="reminder_claim", sparse=True),
+    ],
+    "schedules": [
+        IndexModel([("user_id", ASCENDING), ("start_time", ASCENDING), ("_id", ASCENDING)], name="user_id_start_time_id"),
+    ],
+    "email_outbox": [
+        IndexModel(
+            [("status", ASCENDING), ("priority", ASCENDING), ("next_attempt_at", ASCENDING)],
+            name="status_priority_next_attempt",
+        ),
+        IndexModel([("sent_at", ASCENDING)], name="sent_at_ttl", expireAfterSeconds=7 * 24 * 3600),
+        IndexModel(
+            [("dedupe_key", ASCENDING)],
+            name="dedupe_key_unique",
+            unique=True,
+            partialFilterExpression={"dedupe_key": {"$exists": True}},
+        ),
+    ],
+    "scheduler_leases": [
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=24 * 3600),
+    ],
+    "scheduler_instances": [
+        IndexModel([("heartbeat_at", ASCENDING)], name="heartbeat_at_ttl", expireAfterSeconds=3600),
+    ],
+    "reminder_events": [
+        IndexModel([("status", ASCENDING), ("fire_at", ASCENDING)], name="status_fire_at"),
+        IndexModel([("assignment_id", ASCENDING), ("status", ASCENDING)], name="assignment_id_status"),
+        IndexModel([("claim", ASCENDING)], name="claim", sparse=True),
+        IndexModel([("finished_at", ASCENDING)], name="finished_at_ttl", expireAfterSeconds=30 * 24 * 3600),
+    ],
+    "chat_messages": [
+        IndexModel([("user_id", ASCENDING), ("_id", ASCENDING)], name="user_id_id"),
+    ],
+    "llm_cache": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "email_digest_items": [
+        IndexModel([("to", ASCENDING), ("flush_at", ASCENDING)], name="to_flush_at"),
+        IndexModel([("claim", ASCENDING)], name="claim", sparse=True),
+        IndexModel(
+            [("dedupe_key", ASCENDING)],
+            name="dedupe_key_unique",
+            unique=True,
+            partialFilterExpression={"dedupe_key": {"$exists": True}},
+        ),
+    ],
+}
+
+# Indexes the app cannot run correctly without: registration relies on
+# email_unique to reject duplicate addresses
+REQUIRED_INDEXES = {
+    "users": ["email_unique"],
+}
+_required_ready = False
+
+# Collections that must be created capped before anything else touches them
+CAPPED_COLLECTIONS = {
+    "chat_messages": settings.CHAT_HISTORY_CAPPED_BYTES,
+}
+
+def _query_shapes():
+    """Representative query shapes issued by the routers and the scheduler.
+
+    Each entry is (description, collection, filter, sort). Values are
+    placeholders; only the shape matters to the query planner.
+    """
+    user_id = str(ObjectId())
+    now = datetime.utcnow()
+    return [
+        ("auth: user by email", "users", {"email": "student@example.com"}, None),
+        ("courses: list", "courses", {"user_id": user_id}, [("_id", ASCENDING)]),
+        ("courses: detail", "courses", {"_id": ObjectId(), "user_id": user_id}, None),
+        ("assignments: list", "assignments", {"user_id": user_id}, [("due_date", ASCENDING), ("_id", ASCENDING)]),
+        ("assignments: detail", "assignments", {"_id": ObjectId(), "user_id": user_id}, None),
+        ("schedules: list", "schedules", {"user_id": user_id}, [("start_time", ASCENDING), ("_id", ASCENDING)]),
+        ("schedules: detail", "schedules", {"_id": ObjectId(), "user_id": user_id}, None),
+        ("email outbox: claim", "email_outbox", {
+            "status": "pending",
+            "next_attempt_at": {"$lte": now},
+        }, [("priority", ASCENDING), ("next_attempt_at", ASCENDING)]),
+        ("reminder events: next due", "reminder_events", {
+            "status": "pending",
+            "fire_at": {"$lte": now},
+        }, [("fire_at", ASCENDING)]),
+        ("reminder events: by assignment", "reminder_events", {"assignment_id": ObjectId(), "status": "pending"}, None),
+        ("chat: history", "chat_messages", {"user_id": user_id, "_id": {"$gt": ObjectId()}}, [("_id", -1)]),
+        ("email digest: claim", "email_digest_items", {
+            "to": "student@example.com",
+            "claimed_until": {"$not": {"$gt": now}},
+        }, None),
+        ("scheduler: reminder scan", "assignments", {
+            "due_date": {"$gte": now, "$lte": now + timedelta(days=2, hours=1)},
+            "completed": False,
+            "reminder_sent": False,
+        }, None),
+        ("scheduler: sharded reminder scan", "assignments", {
+            "due_date": {"$gte": now, "$lte": now + timedelta(days=2, hours=1)},
+            "completed": False,
+            "reminder_sent": False,
+            "user_bucket": {"$mod": [3, 1]},
+        }, None),
+        ("scheduler: reminder claim", "assignments", {"reminder_claim": "claim"}, None),
+    ]
+
+async def ensure_capped(db) -> None:
+    """Create the capped collections that do not exist yet; an existing collection is left as is"""
+    existing = set(await db.list_collection_names())
+    for collection_name, size in CAPPED_COLLECTIONS.items():
+        if collection_name in existing:
+            continue
+        try:
+            await db.create_collection(collection_name, capped=True, size=size)
+            logger.info(f"📦 Capped collection ready: {collection_name} ({size} bytes)")
+        except CollectionInvalid:
+            pass  # created concurrently by another instance
+        except OperationFailure as e:
+            logger.error(f"❌ Could not create capped collection {collection_name}: {e}")
+
+async def required_indexes_ready(db) -> bool:
+    """True once every required index exists; cached after the first success"""
+    global _required_ready
+    if _required_ready:
+        return True
+    for collection_name, names in REQUIRED_INDEXES.items():
+        existing = await db[collection_name].index_information()
+        if any(name not in existing for name in names):
+            return False
+    _required_ready = True
+    return True
+
+async def ensure_required_indexes(db) -> None:
+    """Create only the required indexes; raises when one of them cannot be built"""
+    for collection_name, names in REQUIRED_INDEXES.items():
+        models = [model for model in INDEXES[collection_name] if model.document["name"] in names]
+        await db[collection_name].create_indexes(models)
+
+async def ensure_indexes(db) -> None:
+    """Create every declared index, logging (not raising) per-index failures.
+    
+    Raises when a required index is still missing afterwards, so warm-up
+    retries and /health keeps reporting the app as starting.
+    """
+    await ensure_capped(db)
+    for collection_name, models in INDEXES.items():
+        collection = db[collection_name]
+        for model in models:
+            name = model.document["name"]
+            try:
+                await collection.create_indexes([model])
+                logger.info(f"📇 Index ready: {collection_name}.{name}")
+            except OperationFailure as e:
+                logger.error(f"❌ Could not create index {collection_name}.{name}: {e}")
+    if not await required_indexes_ready(db):
+        raise RuntimeError(f"Required indexes missing: {REQUIRED_INDEXES}")
+
+def _plan_stages(plan: dict) -> list:
+    """Flatten the stage names of an explain plan tree"""
+    stages = []
+    if not isinstance(plan, dict):
+        return stages
+    if "stage" in plan:
+        stages.append(plan["stage"])
+    for key in ("inputStage", "queryPlan", "outerStage", "innerStage"):
+        if key in plan:
+            stages.extend(_plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+async def check_query_plans(db) -> list:
+    """Explain every query shape and return the descriptions that COLLSCAN"""
+    failures = []
+    for description, collection_name, query, sort in _query_shapes():
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        stages = _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        status = "COLLSCAN" if "COLLSCAN" in stages else "ok"
+        logger.info(f"🔎 {description}: {' <- '.join(stages)} [{status}]")
+        if status == "COLLSCAN":
+            failures.append(description)
+    return failures
+
+async def _main(check: bool) -> int:
+    db = await get_database()
+    try:
+        await ensure_indexes(db)
+        if not check:
+            return 0
+        failures = await check_query_plans(db)
+        if failures:
+            logger.error(f"❌ Collection scans found in: {', '.join(failures)}")
+            return 1
+        logger.info("✅ All query shapes are served by an index")
+        return 0
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create declared MongoDB indexes")
+    parser.add_argument("--check", action="store_true", help="explain router query shapes and fail on COLLSCAN")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    sys.exit(asyncio.run(_main(args.check)))
@@ -0,0 +1,125 @@
+import hashlib
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+from backend.config import settings
+from backend.cache import TTLCache
+from backend.database import get_database
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s.!?]+$")
+
+def normalize_message(message: str) -> str:
+    """Fold case, quotes, whitespace and trailing punctuation so near-identical questions match"""
+    text = message.lower().replace("’", "'").replace("‘", "'")
+    text = _WHITESPACE.sub(" ", text).strip()
+    return _TRAILING_PUNCTUATION.sub("", text)
+
+def cache_key(user_id: str, message: str, system_prompt: str) -> str:
+    """Key on the user, the normalized message and a fingerprint of the context-bearing system prompt"""
+    fingerprint = hashlib.sha256(system_prompt.encode()).hexdigest()
+    return hashlib.sha256(f"{user_id}\0{fingerprint}\0{normalize_message(message)}".encode()).hexdigest()
+
+class MemoryLLMCache:
+    """Per-process backend: LRU with TTL, lost on restart"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._entries.get(key)
+
+    async def set(self, key: str, response: str) -> None:
+        self._entries.set(key, response)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+class MongoLLMCache:
+    """Shared backend in the llm_cache collection; a TTL index removes expired entries"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+
+    async def get(self, key: str) -> Optional[str]:
+        db = await get_database()
+        entry = await db.llm_cache.find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.utcnow()}}, {"response": 1}
+        )
+        return entry["response"] if entry else None
+
+    async def set(self, key: str, response: str) -> None:
+        db = await get_database()
+        await db.llm_cache.update_one(
+            {"_id": key},
+            {"$set": {"response": response, "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl)}},
+            upsert=True
+        )
+
+    def size(self) -> Optional[int]:
+        return None
+
+class LLMResponseCache:
+    """Counts hits and misses around a pluggable backend.
+
+    Backend failures are logged and treated as misses, so the cache can
+    never take the chat endpoint down with it.
+    """
+
+    def __init__(self, backend, max_response_chars: int):
+        self.backend = backend
+        self.max_response_chars = max_response_chars
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        if self.backend is None:
+            return None
+        try:
+            response = await self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"⚠️ LLM cache read failed: {e}")
+            response = None
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return response
+
+    async def set(self, key: str, response: str) -> None:
+        if self.backend is None or not response or len(response) > self.max_response_chars:
+            return
+        try:
+            await self.backend.set(key, response)
+            self.stores += 1
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"⚠️ LLM cache write failed: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__ if self.backend else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "errors": self.errors,
+            "size": self.backend.size() if self.backend else 0,
+        }
+
+def _make_backend():
+    if settings.CHAT_CACHE_BACKEND == "memory":
+        return MemoryLLMCache(maxsize=settings.CHAT_CACHE_SIZE, ttl=settings.CHAT_CACHE_TTL_SECONDS)
+    if settings.CHAT_CACHE_BACKEND == "mongo":
+        return MongoLLMCache(ttl=settings.CHAT_CACHE_TTL_SECONDS)
+    return None
+
+# Create a singleton instance
+llm_cache = LLMResponseCache(_make_backend(), settings.CHAT_CACHE_MAX_RESPONSE_CHARS)
@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Deque, Optional, TypeVar
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Upstream statuses worth another attempt
+_TRANSIENT_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+# Exception class names used by the openai and httpx clients for retryable failures
+_TRANSIENT_ERRORS = {
+    "APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError",
+    "ServiceUnavailableError", "Timeout", "TryAgain", "ConnectError", "ReadTimeout", "RemoteProtocolError",
+}
+
+class LLMError(Exception):
+    """Base class for admission and deadline failures, mapped to HTTP statuses by the router"""
+    status_code = 503
+    detail = "The AI assistant is unavailable, please try again shortly"
+
+class LLMOverloaded(LLMError):
+    status_code = 429
+    detail = "The AI assistant is busy, please try again in a few seconds"
+
+class LLMUnavailable(LLMError):
+    status_code = 503
+    detail = "The AI assistant is unavailable, please try again shortly"
+
+class LLMTimeout(LLMError):
+    status_code = 504
+    detail = "The AI assistant took too long to respond"
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "http_status", None)
+    if status in _TRANSIENT_STATUSES:
+        return True
+    return any(cls.__name__ in _TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+class LLMLimiter:
+    """Bounded admission for model calls.
+
+    At most `max_concurrency` calls run at once and at most `max_queue` wait
+    for a slot; further requests are rejected immediately instead of piling
+    up on the event loop. Waiting is capped at `queue_timeout`; once admitted,
+    a call and its retries of transient upstream errors (with jittered
+    exponential backoff) share a single `call_timeout` deadline.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+        call_timeout: float,
+        max_retries: int,
+        retry_base: float,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.call_timeout = call_timeout
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.failures = 0
+        self._waits: Deque[float] = deque(maxlen=1000)
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        return self._slots
+
+    def check_admission(self) -> None:
+        """Fail fast when the queue is already full, before any response has started"""
+        if self.in_flight + self.waiting >= self.max_concurrency + self.max_queue:
+            self.rejected_full += 1
+            raise LLMOverloaded()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the concurrency slots, queueing for at most queue_timeout"""
+        self.check_admission()
+        slots = self._semaphore()
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected_timeout += 1
+            raise LLMUnavailable()
+        finally:
+            self.waiting -= 1
+        self._waits.append(time.monotonic() - started)
+        self.admitted += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            slots.release()
+
+    async def _backoff(self, attempt: int, deadline: float) -> None:
+        delay = random.uniform(0, self.retry_base * 2 ** attempt)
+        remaining = deadline - time.monotonic()
+        if delay >= remaining:
+            self.timeouts += 1
+            raise LLMTimeout()
+        self.retries += 1
+        await asyncio.sleep(delay)
+
+    def _give_up(self, error: Exception, attempt: int) -> bool:
+        return attempt >= self.max_retries or not _is_transient(error)
+
+    async def call(self, fn: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        """Run one model call under the limiter, retrying transient failures"""
+        async with self.slot():
+            deadline = time.monotonic() + self.call_timeout
+            attempt = 0
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise LLMTimeout()
+                try:
+                    return await asyncio.wait_for(fn(*args, **kwargs), timeout=remaining)
+                except asyncio.TimeoutError:
+                    if time.monotonic() >= deadline:
+                        self.timeouts += 1
+                        raise LLMTimeout()
+                    error = asyncio.TimeoutError()
+                except Exception as e:
+                    error = e
+                if self._give_up(error, attempt):
+                    self.failures += 1
+                    raise error
+                attempt += 1
+                logger.info(f"🔁 Retrying model call after {type(error).__name__} (attempt {attempt})")
+                await self._backoff(attempt, deadline)
+
+    async def stream(self, make_stream: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Stream a model response under the limiter.
+
+        The slot is held until the stream ends or the consumer stops reading.
+        Transient failures are retried only before the first chunk, so a
+        client never sees a reply restart halfway through.
+        """
+        async with self.slot():
+            deadline = time.monotonic() + self.call_timeout
+            attempt = 0
+            while True:
+                upstream = make_stream()
+                started = False
+                try:
+                    while True:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise asyncio.TimeoutError()
+                        try:
+                            chunk = await asyncio.wait_for(upstream.__anext__(), timeout=remaining)
+                        except StopAsyncIteration:
+                            return
+                        started = True
+                        yield chunk
+                except Exception as error:
+                    if time.monotonic() >= deadline:
+                        self.timeouts += 1
+                        raise LLMTimeout()
+                    if started or self._give_up(error, attempt):
+                        self.failures += 1
+                        raise
+                    attempt += 1
+                    logger.info(f"🔁 Retrying model stream after {type(error).__name__} (attempt {attempt})")
+                    await self._backoff(attempt, deadline)
+                finally:
+                    await upstream.aclose()
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+
+        def percentile(fraction: float) -> float:
+            return round(waits[min(len(waits) - 1, int(len(waits) * fraction))] * 1000, 1) if waits else 0.0
+
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_full,
+            "rejected_queue_timeout": self.rejected_timeout,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "failures": self.failures,
+            "wait_ms_p50": percentile(0.5),
+            "wait_ms_p95": percentile(0.95),
+            "wait_ms_max": round(waits[-1] * 1000, 1) if waits else 0.0,
+        }
+
+# Create a singleton instance
+llm_limiter = LLMLimiter(
+    max_concurrency=settings.CHAT_LLM_CONCURRENCY,
+    max_queue=settings.CHAT_LLM_QUEUE_SIZE,
+    queue_timeout=settings.CHAT_LLM_QUEUE_TIMEOUT_SECONDS,
+    call_timeout=settings.CHAT_LLM_TIMEOUT_SECONDS,
+    max_retries=settings.CHAT_LLM_MAX_RETRIES,
+    retry_base=settings.CHAT_LLM_RETRY_BASE_SECONDS,
+)
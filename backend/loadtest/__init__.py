@@ -0,0 +1,16 @@
+"""End-to-end load testing against local stand-ins for Atlas, Gmail and OpenAI.
+
+Start the API in one terminal (seeding is idempotent per database name):
+
+    python -m backend.loadtest.serve --mongo-url mongodb://localhost:27017 --seed-users 100000
+
+or, without a local mongod, against an in-memory fake (pip install mongomock-motor):
+
+    python -m backend.loadtest.serve --fake-mongo --seed-users 2000
+
+then drive it from another:
+
+    python -m backend.loadtest.traffic --users 100000 --sessions 200 --duration 60
+
+Extra dependencies: aiosmtpd (SMTP sink), httpx (traffic), mongomock-motor (--fake-mongo).
+"""
@@ -0,0 +1,103 @@
+"""Synthetic users with realistic course, assignment and schedule counts.
+
+Imports from the app are deferred to seed() so the traffic generator can share
+the account constants without loading the app's settings.
+"""
+import random
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+
+PASSWORD = "loadtest-password"
+PRIORITIES = ("low", "medium", "high")
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday")
+
+def user_email(index: int) -> str:
+    return f"loadtest-{index}@example.com"
+
+def _user_documents(rng: random.Random, index: int, hashed_password: str, now: datetime, user_bucket) -> tuple:
+    user_id = ObjectId()
+    uid = str(user_id)
+    bucket = user_bucket(uid)
+    user = {
+        "_id": user_id,
+        "email": user_email(index),
+        "full_name": f"Load Test {index}",
+        "hashed_password": hashed_password,
+        "token_version": 0,
+        "email_digest": rng.random() < 0.8,
+        "created_at": now,
+    }
+    courses, assignments, schedules = [], [], []
+    for c in range(rng.randint(3, 7)):
+        course_id = ObjectId()
+        courses.append({
+            "_id": course_id,
+            "course_name": f"Course {c + 1}",
+            "course_code": f"LT{100 + c}",
+            "instructor": f"Instructor {rng.randint(1, 500)}",
+            "description": "Synthetic course",
+            "user_id": uid,
+            "created_at": now,
+        })
+        for a in range(rng.randint(2, 6)):
+            due_date = now + timedelta(days=rng.uniform(-30, 60))
+            assignments.append({
+                "title": f"Assignment {c + 1}.{a + 1}",
+                "description": "Synthetic assignment",
+                "course_id": str(course_id),
+                "due_date": due_date,
+                "priority": rng.choice(PRIORITIES),
+                "completed": due_date < now and rng.random() < 0.8,
+                "reminder_sent": due_date < now,
+                "user_id": uid,
+                "user_bucket": bucket,
+                "created_at": now,
+            })
+    for s in range(rng.randint(4, 12)):
+        start_time = now + timedelta(days=rng.uniform(-7, 30), hours=rng.randint(8, 18))
+        schedules.append({
+            "title": f"Session {s + 1}",
+            "course_id": str(rng.choice(courses)["_id"]),
+            "start_time": start_time,
+            "end_time": start_time + timedelta(hours=rng.choice((1, 1.5, 2))),
+            "day_of_week": rng.choice(DAYS),
+            "location": f"Room {rng.randint(100, 400)}",
+            "user_id": uid,
+            "created_at": now,
+        })
+    return user, courses, assignments, schedules
+
+async def seed(db, users: int, batch_users: int = 1000, random_seed: int = 42) -> dict:
+    """Insert `users` synthetic users (and their data) unless they already exist.
+
+    Every user shares one password hash so seeding is not bound by bcrypt.
+    Returns the number of documents inserted per collection.
+    """
+    from backend.coordination import user_bucket
+    from backend.passwords import pwd_context
+
+    counts = {"users": 0, "courses": 0, "assignments": 0, "schedules": 0}
+    if await db.users.find_one({"email": user_email(users - 1)}, {"_id": 1}):
+        print(f"Seed data for {users} users already present")
+        return counts
+
+    rng = random.Random(random_seed)
+    hashed_password = pwd_context.hash(PASSWORD)
+    now = datetime.utcnow()
+    started = time.perf_counter()
+    for first in range(0, users, batch_users):
+        batch = {name: [] for name in counts}
+        for index in range(first, min(first + batch_users, users)):
+            user, courses, assignments, schedules = _user_documents(rng, index, hashed_password, now, user_bucket)
+            batch["users"].append(user)
+            batch["courses"].extend(courses)
+            batch["assignments"].extend(assignments)
+            batch["schedules"].extend(schedules)
+        for name, documents in batch.items():
+            await db[name].insert_many(documents, ordered=False)
+            counts[name] += len(documents)
+        print(f"Seeded {counts['users']}/{users} users ({time.perf_counter() - started:.0f}s)", end="\r")
+    print()
+    print(", ".join(f"{count} {name}" for name, count in counts.items()))
+    return counts
@@ -0,0 +1,77 @@
+"""Run the API against local stand-ins for MongoDB, SMTP and the chat model.
+
+    python -m backend.loadtest.serve --mongo-url mongodb://localhost:27017 --seed-users 100000
+    python -m backend.loadtest.serve --fake-mongo --seed-users 2000 --llm-first-token-ms 800
+"""
+import argparse
+import asyncio
+import os
+
+def _configure_environment(args) -> None:
+    # Settings are read at import time, so this must run before anything under backend is imported
+    os.environ["MONGODB_URL"] = args.mongo_url
+    os.environ["DATABASE_NAME"] = args.database
+    os.environ["SMTP_HOST"] = "127.0.0.1"
+    os.environ["SMTP_PORT"] = str(args.smtp_port)
+    os.environ["SMTP_USER"] = ""
+    os.environ["SMTP_PASSWORD"] = ""
+    os.environ["SMTP_START_TLS"] = "false"
+    os.environ["EMAIL_FROM"] = "planner@loadtest.local"
+    os.environ.setdefault("OPENAI_API_KEY", "loadtest-stub")
+    if args.fake_mongo:
+        # The reminder backfill is a full unindexed scan per assignment on the fake
+        os.environ["REMINDER_DISPATCH"] = "scan"
+
+async def main(args) -> None:
+    _configure_environment(args)
+
+    import uvicorn
+    from backend.loadtest.standins import SMTPSink, StubChatModel, install_stub_llm, use_fake_mongo
+    from backend.loadtest.seed import seed
+    from backend.database import get_database
+
+    sink = SMTPSink("127.0.0.1", args.smtp_port).start()
+    print(f"✅ SMTP sink listening on 127.0.0.1:{args.smtp_port}")
+
+    if args.fake_mongo:
+        use_fake_mongo(args.database)
+        print("✅ Using in-memory MongoDB fake")
+
+    model = StubChatModel(
+        first_token_ms=args.llm_first_token_ms,
+        token_ms=args.llm_token_ms,
+        tokens=args.llm_tokens,
+    )
+    install_stub_llm(model)
+    print(f"✅ Stub chat model: {args.llm_first_token_ms:g} ms to first token, {args.llm_tokens} tokens")
+
+    if args.seed_users:
+        db = await get_database()
+        if args.reset:
+            for name in ("users", "courses", "assignments", "schedules"):
+                await db[name].delete_many({})
+        await seed(db, args.seed_users)
+
+    from backend.main import app
+    server = uvicorn.Server(uvicorn.Config(app, host=args.host, port=args.port, log_level=args.log_level))
+    try:
+        await server.serve()
+    finally:
+        sink.stop()
+        print(f"📊 SMTP sink received {sink.received} messages; stub model served {model.calls} calls")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="loadtest")
+    parser.add_argument("--fake-mongo", action="store_true", help="use mongomock-motor instead of a mongod")
+    parser.add_argument("--seed-users", type=int, default=0)
+    parser.add_argument("--reset", action="store_true", help="drop seeded collections before seeding")
+    parser.add_argument("--smtp-port", type=int, default=8025)
+    parser.add_argument("--llm-first-token-ms", type=float, default=300)
+    parser.add_argument("--llm-token-ms", type=float, default=20)
+    parser.add_argument("--llm-tokens", type=int, default=120)
+    parser.add_argument("--log-level", default="warning")
+    asyncio.run(main(parser.parse_args()))
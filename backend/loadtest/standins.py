@@ -0,0 +1,112 @@
+"""Local stand-ins for the app's external services: MongoDB, SMTP and the chat model."""
+import asyncio
+import logging
+import random
+from typing import AsyncIterator
+
+logger = logging.getLogger(__name__)
+
+_WORDS = (
+    "start with the assignment due soonest and block out two focused hours for it today then review "
+    "your lecture notes before the next class and leave the lower priority reading for the weekend"
+).split()
+
+class StubMessage:
+    """Just enough of a LangChain message for the chatbot: a `content` attribute"""
+
+    def __init__(self, content: str):
+        self.content = content
+
+class StubChatModel:
+    """Stands in for ChatOpenAI with configurable latency and reply length.
+
+    Replies take `first_token_ms` before the first token and `token_ms` per
+    token after it, with +/-`jitter` relative noise, in both ainvoke and astream.
+    """
+
+    def __init__(self, first_token_ms: float = 300, token_ms: float = 20, tokens: int = 120, jitter: float = 0.2):
+        self.first_token_ms = first_token_ms
+        self.token_ms = token_ms
+        self.tokens = tokens
+        self.jitter = jitter
+        self.calls = 0
+
+    def _delay(self, ms: float) -> float:
+        return max(0.0, ms * random.uniform(1 - self.jitter, 1 + self.jitter)) / 1000
+
+    def _reply(self) -> list:
+        return [_WORDS[i % len(_WORDS)] + " " for i in range(self.tokens)]
+
+    async def ainvoke(self, messages, **kwargs) -> StubMessage:
+        self.calls += 1
+        await asyncio.sleep(self._delay(self.first_token_ms + self.token_ms * self.tokens))
+        return StubMessage("".join(self._reply()))
+
+    async def astream(self, messages, **kwargs) -> AsyncIterator[StubMessage]:
+        self.calls += 1
+        await asyncio.sleep(self._delay(self.first_token_ms))
+        for token in self._reply():
+            yield StubMessage(token)
+            await asyncio.sleep(self._delay(self.token_ms))
+
+def install_stub_llm(model: StubChatModel) -> None:
+    """Make the chatbot use `model`; its lazy ChatOpenAI setup is skipped once llm is set"""
+    from backend.ai_chatbot import chatbot
+    chatbot.llm = model
+    chatbot.graph = chatbot._create_graph()
+
+class SMTPSink:
+    """An aiosmtpd server that accepts and counts every message"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.received = 0
+        self._controller = None
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+    def start(self) -> "SMTPSink":
+        from aiosmtpd.controller import Controller
+        self._controller = Controller(self, hostname=self.host, port=self.port)
+        self._controller.start()
+        return self
+
+    def stop(self) -> None:
+        if self._controller is not None:
+            self._controller.stop()
+            self._controller = None
+
+def use_fake_mongo(database_name: str):
+    """Point the app at an in-memory mongomock-motor database.
+
+    The fake has no server-side $lookup with `let`, pipeline updates or
+    $mod, so the reminder scan and the completion toggle behave differently
+    than on a real server; use a local mongod for representative numbers.
+    It has no capped collections or partial indexes either, so only the
+    required indexes are built and chat history goes to a plain collection.
+    """
+    from mongomock_motor import AsyncMongoMockClient
+    import backend.conversation as conversation
+    import backend.database as database
+    import backend.main as main
+    from backend.indexes import ensure_required_indexes
+
+    client = AsyncMongoMockClient()
+    database.db.client = client
+    database.db.db = client[database_name]
+
+    async def connect_to_fake():
+        database.db.client = client
+        database.db.db = client[database_name]
+
+    async def skip_capped(db):
+        pass
+
+    database.connect_to_mongo = connect_to_fake
+    main.connect_to_mongo = connect_to_fake
+    main.ensure_indexes = ensure_required_indexes
+    conversation.ensure_capped = skip_capped
+    return database.db.db
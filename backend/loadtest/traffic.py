@@ -0,0 +1,415 @@
+"""Replay a weighted traffic mix against a running API and report per-route latency.
+
+    python -m backend.loadtest.traffic --users 100000 --sessions 200 --duration 60
+    python -m backend.loadtest.traffic --mix chat --sessions 50 --json results.json
+
+Each session logs in as a random seeded user, then issues requests drawn from
+the mix with `--think-ms` of idle time between them. Routes are reported by
+template (ids replaced with {id}); streamed chat also reports time to first token.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import httpx
+from backend.loadtest.seed import PASSWORD, PRIORITIES, user_email
+
+CHAT_MESSAGES = (
+    "What should I work on today?",
+    "Which assignments are due this week?",
+    "Help me plan my study time for tomorrow",
+    "How many high priority assignments do I have?",
+    "When is my next class?",
+)
+
+class Recorder:
+    """Latency samples and status counts per route template"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.transport_errors: Dict[str, int] = defaultdict(int)
+
+    def add(self, route: str, seconds: float, status: Optional[int]) -> None:
+        if status is None:
+            self.transport_errors[route] += 1
+            return
+        self.latencies[route].append(seconds)
+        self.statuses[route][status] += 1
+
+    def report(self, elapsed: float) -> List[dict]:
+        rows = []
+        for route in sorted(set(self.latencies) | set(self.transport_errors)):
+            samples = sorted(self.latencies[route])
+            statuses = self.statuses[route]
+
+            def percentile(fraction: float) -> float:
+                if not samples:
+                    return 0.0
+                return round(samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000, 1)
+
+            rows.append({
+                "route": route,
+                "count": len(samples),
+                "rps": round(len(samples) / elapsed, 2),
+                "p50_ms": percentile(0.5),
+                "p95_ms": percentile(0.95),
+                "p99_ms": percentile(0.99),
+                "max_ms": round(samples[-1] * 1000, 1) if samples else 0.0,
+                "4xx": sum(n for code, n in statuses.items() if 400 <= code < 500 and code != 429),
+                "429": statuses.get(429, 0),
+                "5xx": sum(n for code, n in statuses.items() if code >= 500),
+                "transport_errors": self.transport_errors[route],
+            })
+        return rows
+
+class Session:
+    """One logged-in client with the ids it has seen so far"""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, users: int):
+        self.client = client
+        self.recorder = recorder
+        self.users = users
+        self.headers: dict = {}
+        self.course_ids: List[str] = []
+        self.assignment_ids: List[str] = []
+        self.schedule_ids: List[str] = []
+        self.created_courses: List[str] = []
+        self.created_assignments: List[str] = []
+        self.created_schedules: List[str] = []
+        self.etags: Dict[str, str] = {}
+
+    async def request(self, route: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers={**self.headers, **kwargs.pop("headers", {})}, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.add(route, time.perf_counter() - started, None)
+            return None
+        self.recorder.add(route, time.perf_counter() - started, response.status_code)
+        if response.status_code == 401 and self.headers:
+            await self.login()
+        return response
+
+    async def login(self) -> None:
+        self.headers = {}
+        email = user_email(random.randrange(self.users))
+        response = await self.request(
+            "POST /api/auth/login", "POST", "/api/auth/login", data={"username": email, "password": PASSWORD}
+        )
+        if response is not None and response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            self.course_ids, self.assignment_ids, self.schedule_ids = [], [], []
+            self.etags = {}
+
+    async def start(self) -> None:
+        await self.login()
+        await self.list_courses()
+        await self.list_assignments()
+        await self.list_schedules()
+
+    # Lists
+
+    async def _list(self, route: str, url: str, params: Optional[dict] = None, conditional: bool = False):
+        headers = {}
+        if conditional and url in self.etags:
+            headers = {"If-None-Match": self.etags[url]}
+            route = f"{route} (If-None-Match)"
+        response = await self.request(route, "GET", url, params=params, headers=headers)
+        if response is not None and response.status_code == 200:
+            if not params and "ETag" in response.headers:
+                self.etags[url] = response.headers["ETag"]
+            return response.json()
+        return None
+
+    async def list_courses(self, conditional: bool = False) -> None:
+        items = await self._list("GET /api/courses/", "/api/courses/", conditional=conditional)
+        if items is not None:
+            self.course_ids = [item["id"] for item in items]
+
+    async def list_assignments(self, conditional: bool = False) -> None:
+        items = await self._list("GET /api/assignments/", "/api/assignments/", conditional=conditional)
+        if items is not None:
+            self.assignment_ids = [item["id"] for item in items]
+
+    async def list_assignments_filtered(self) -> None:
+        now = datetime.utcnow()
+        params = random.choice((
+            {"completed": "false"},
+            {"priority": random.choice(PRIORITIES)},
+            {"due_after": now.isoformat(), "due_before": (now + timedelta(days=7)).isoformat()},
+            {"course_id": random.choice(self.course_ids)} if self.course_ids else {"completed": "true"},
+            {"limit": 5},
+        ))
+        await self._list("GET /api/assignments/?filter", "/api/assignments/", params=params)
+
+    async def list_assignments_ndjson(self) -> None:
+        await self.request(
+            "GET /api/assignments/ (ndjson)", "GET", "/api/assignments/",
+            headers={"Accept": "application/x-ndjson"}
+        )
+
+    async def list_schedules(self, conditional: bool = False) -> None:
+        items = await self._list("GET /api/schedules/", "/api/schedules/", conditional=conditional)
+        if items is not None:
+            self.schedule_ids = [item["id"] for item in items]
+
+    async def list_schedules_window(self) -> None:
+        now = datetime.utcnow()
+        params = {"start_after": now.isoformat(), "start_before": (now + timedelta(days=7)).isoformat()}
+        await self._list("GET /api/schedules/?filter", "/api/schedules/", params=params)
+
+    # Single documents
+
+    async def get_course(self) -> None:
+        if self.course_ids:
+            await self.request("GET /api/courses/{id}", "GET", f"/api/courses/{random.choice(self.course_ids)}")
+
+    async def get_assignment(self) -> None:
+        if self.assignment_ids:
+            await self.request("GET /api/assignments/{id}", "GET", f"/api/assignments/{random.choice(self.assignment_ids)}")
+
+    async def get_schedule(self) -> None:
+        if self.schedule_ids:
+            await self.request("GET /api/schedules/{id}", "GET", f"/api/schedules/{random.choice(self.schedule_ids)}")
+
+    # Writes
+
+    def _course_body(self) -> dict:
+        code = random.randint(100, 999)
+        return {"course_name": f"Load Course {code}", "course_code": f"LD{code}", "instructor": "Load Test"}
+
+    def _assignment_body(self) -> dict:
+        due_date = datetime.utcnow() + timedelta(days=random.uniform(1, 30))
+        return {
+            "title": f"Load assignment {random.randint(1, 9999)}",
+            "course_id": random.choice(self.course_ids),
+            "due_date": due_date.isoformat(),
+            "priority": random.choice(PRIORITIES),
+        }
+
+    def _schedule_body(self) -> dict:
+        start_time = datetime.utcnow() + timedelta(days=random.uniform(0, 14))
+        return {
+            "title": f"Load session {random.randint(1, 9999)}",
+            "course_id": random.choice(self.course_ids) if self.course_ids else None,
+            "start_time": start_time.isoformat(),
+            "end_time": (start_time + timedelta(hours=1)).isoformat(),
+            "location": "Load Lab",
+        }
+
+    async def create_course(self) -> None:
+        response = await self.request("POST /api/courses/", "POST", "/api/courses/", json=self._course_body())
+        if response is not None and response.status_code == 200:
+            course_id = response.json()["id"]
+            self.course_ids.append(course_id)
+            self.created_courses.append(course_id)
+
+    async def update_course(self) -> None:
+        if self.course_ids:
+            course_id = random.choice(self.course_ids)
+            await self.request("PUT /api/courses/{id}", "PUT", f"/api/courses/{course_id}", json=self._course_body())
+
+    async def delete_course(self) -> None:
+        # Only courses this session created, so the seeded data keeps its shape
+        if self.created_courses:
+            course_id = self.created_courses.pop()
+            await self.request("DELETE /api/courses/{id}", "DELETE", f"/api/courses/{course_id}")
+            if course_id in self.course_ids:
+                self.course_ids.remove(course_id)
+
+    async def create_assignment(self) -> None:
+        if not self.course_ids:
+            return
+        response = await self.request("POST /api/assignments/", "POST", "/api/assignments/", json=self._assignment_body())
+        if response is not None and response.status_code == 200:
+            assignment_id = response.json()["id"]
+            self.assignment_ids.append(assignment_id)
+            self.created_assignments.append(assignment_id)
+
+    async def update_assignment(self) -> None:
+        if self.assignment_ids and self.course_ids:
+            assignment_id = random.choice(self.assignment_ids)
+            await self.request(
+                "PUT /api/assignments/{id}", "PUT", f"/api/assignments/{assignment_id}", json=self._assignment_body()
+            )
+
+    async def toggle_assignment(self) -> None:
+        if self.assignment_ids:
+            assignment_id = random.choice(self.assignment_ids)
+            await self.request(
+                "PATCH /api/assignments/{id}/complete", "PATCH", f"/api/assignments/{assignment_id}/complete"
+            )
+
+    async def delete_assignment(self) -> None:
+        if self.created_assignments:
+            assignment_id = self.created_assignments.pop()
+            await self.request("DELETE /api/assignments/{id}", "DELETE", f"/api/assignments/{assignment_id}")
+            if assignment_id in self.assignment_ids:
+                self.assignment_ids.remove(assignment_id)
+
+    async def create_schedule(self) -> None:
+        response = await self.request("POST /api/schedules/", "POST", "/api/schedules/", json=self._schedule_body())
+        if response is not None and response.status_code == 200:
+            schedule_id = response.json()["id"]
+            self.schedule_ids.append(schedule_id)
+            self.created_schedules.append(schedule_id)
+
+    async def update_schedule(self) -> None:
+        if self.schedule_ids:
+            schedule_id = random.choice(self.schedule_ids)
+            await self.request("PUT /api/schedules/{id}", "PUT", f"/api/schedules/{schedule_id}", json=self._schedule_body())
+
+    async def delete_schedule(self) -> None:
+        if self.created_schedules:
+            schedule_id = self.created_schedules.pop()
+            await self.request("DELETE /api/schedules/{id}", "DELETE", f"/api/schedules/{schedule_id}")
+            if schedule_id in self.schedule_ids:
+                self.schedule_ids.remove(schedule_id)
+
+    # Account
+
+    async def me(self) -> None:
+        await self.request("GET /api/auth/me", "GET", "/api/auth/me")
+
+    async def get_preferences(self) -> None:
+        await self.request("GET /api/auth/me/preferences", "GET", "/api/auth/me/preferences")
+
+    async def update_preferences(self) -> None:
+        await self.request(
+            "PUT /api/auth/me/preferences", "PUT", "/api/auth/me/preferences",
+            json={"email_digest": random.random() < 0.8}
+        )
+
+    async def register(self) -> None:
+        body = {
+            "email": f"loadtest-new-{uuid.uuid4().hex}@example.com",
+            "full_name": "Load Test Signup",
+            "password": PASSWORD,
+        }
+        await self.request("POST /api/auth/register", "POST", "/api/auth/register", json=body)
+
+    async def logout_all(self) -> None:
+        await self.request("POST /api/auth/logout-all", "POST", "/api/auth/logout-all")
+        await self.login()
+
+    async def health(self) -> None:
+        await self.request("GET /health", "GET", "/health")
+
+    # Chat
+
+    async def chat(self) -> None:
+        await self.request("POST /api/chat/", "POST", "/api/chat/", json={"message": random.choice(CHAT_MESSAGES)})
+
+    async def chat_stream(self) -> None:
+        route = "POST /api/chat/stream"
+        started = time.perf_counter()
+        status = None
+        try:
+            async with self.client.stream(
+                "POST", "/api/chat/stream", headers=self.headers, json={"message": random.choice(CHAT_MESSAGES)}
+            ) as response:
+                status = response.status_code
+                first_token = False
+                async for line in response.aiter_lines():
+                    if not first_token and line.startswith("event: token"):
+                        first_token = True
+                        self.recorder.add(f"{route} (first token)", time.perf_counter() - started, status)
+        except httpx.HTTPError:
+            status = None
+        self.recorder.add(route, time.perf_counter() - started, status)
+
+    async def chat_stats(self) -> None:
+        await self.request("GET /api/chat/stats", "GET", "/api/chat/stats")
+
+    async def clear_chat_history(self) -> None:
+        await self.request("DELETE /api/chat/history", "DELETE", "/api/chat/history")
+
+# Relative weights per operation; every route in backend/routers/ appears in each mix
+MIXES = {
+    "default": {
+        "list_assignments": 10, "list_assignments_conditional": 6, "list_assignments_filtered": 4,
+        "list_assignments_ndjson": 1, "get_assignment": 4, "create_assignment": 2, "update_assignment": 1,
+        "toggle_assignment": 2, "delete_assignment": 1,
+        "list_courses": 6, "list_courses_conditional": 4, "get_course": 2, "create_course": 0.5,
+        "update_course": 0.5, "delete_course": 0.3,
+        "list_schedules": 6, "list_schedules_conditional": 3, "list_schedules_window": 2, "get_schedule": 2,
+        "create_schedule": 1, "update_schedule": 0.5, "delete_schedule": 0.5,
+        "me": 4, "get_preferences": 0.5, "update_preferences": 0.2, "login": 0.5, "register": 0.1,
+        "logout_all": 0.05, "health": 0.5,
+        "chat": 1, "chat_stream": 1, "chat_stats": 0.2, "clear_chat_history": 0.1,
+    },
+}
+MIXES["reads"] = {
+    **MIXES["default"],
+    "create_assignment": 0.2, "update_assignment": 0.1, "toggle_assignment": 0.2, "delete_assignment": 0.1,
+    "create_course": 0.05, "update_course": 0.05, "delete_course": 0.03,
+    "create_schedule": 0.1, "update_schedule": 0.05, "delete_schedule": 0.05,
+    "chat": 0.2, "chat_stream": 0.2,
+}
+MIXES["chat"] = {**MIXES["default"], "chat": 15, "chat_stream": 25, "chat_stats": 1, "clear_chat_history": 1}
+
+def _operation(session: Session, name: str):
+    if name.endswith("_conditional"):
+        return getattr(session, name[: -len("_conditional")])(conditional=True)
+    return getattr(session, name)()
+
+async def _run_session(client: httpx.AsyncClient, recorder: Recorder, args, names, weights, deadline: float) -> None:
+    session = Session(client, recorder, args.users)
+    await session.start()
+    while time.monotonic() < deadline:
+        if not session.headers:
+            await asyncio.sleep(args.think_ms / 1000)
+            await session.login()
+            continue
+        await _operation(session, random.choices(names, weights)[0])
+        if args.think_ms:
+            await asyncio.sleep(random.uniform(0.5, 1.5) * args.think_ms / 1000)
+
+def _print_report(rows: List[dict], elapsed: float) -> None:
+    header = f"{'route':<42} {'count':>7} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'4xx':>5} {'429':>5} {'5xx':>5}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(
+            f"{row['route']:<42} {row['count']:>7} {row['rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+            f"{row['p99_ms']:>8.1f} {row['max_ms']:>8.1f} {row['4xx']:>5} {row['429']:>5} {row['5xx'] + row['transport_errors']:>5}"
+        )
+    total = sum(row["count"] for row in rows if not row["route"].endswith("(first token)"))
+    print(f"\n{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s); latencies in ms")
+
+async def main(args) -> None:
+    mix = MIXES[args.mix]
+    names, weights = list(mix), list(mix.values())
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.sessions, max_keepalive_connections=args.sessions)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            _run_session(client, recorder, args, names, weights, deadline) for _ in range(args.sessions)
+        ))
+        elapsed = time.monotonic() - started
+
+    rows = recorder.report(elapsed)
+    _print_report(rows, elapsed)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"mix": args.mix, "sessions": args.sessions, "elapsed_seconds": round(elapsed, 2), "routes": rows}, f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=1000, help="number of seeded users to log in as")
+    parser.add_argument("--sessions", type=int, default=50, help="concurrent client sessions")
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument("--think-ms", type=float, default=100, help="mean idle time between requests per session")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="default")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--json", help="also write the report to this file")
+    asyncio.run(main(parser.parse_args()))
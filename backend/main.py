@@ -1,20 +1,86 @@
 from fastapi import FastAPI, Response, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from backend.database import connect_to_mongo, close_mongo_connection
+import asyncio
+from backend.database import connect_to_mongo, ping_mongo, warm_pool, close_mongo_connection, get_database
+from backend.pool_stats import pool_stats
+from backend.indexes import ensure_indexes
+from backend.passwords import shutdown_password_pool
+from backend.email_outbox import outbox
+from backend.email_service import send_email
+from backend.smtp_pool import smtp_pool
+from backend.reminder_queue import reminder_dispatcher
+from backend.conversation import conversation_memory, load_encoding
+from backend.config import settings
 from backend.scheduler import start_scheduler, stop_scheduler
+from backend.coordination import deregister
 from backend.routers import auth, courses, assignments, schedules, chat
 
+# Progress of the startup work that runs after the app starts accepting traffic
+startup_state = {"mongo": "pending", "indexes": "pending", "chat": "pending"}
+
+# Backoff between database warm-up attempts
+WARM_UP_MAX_DELAY_SECONDS = 60
+
+async def _warm_database():
+    """Connection check, pool warm-up and index builds, retried until they succeed.
+    
+    Registration relies on the unique email index and chat history on its
+    capped collection, so /health reports the app ready only after this.
+    """
+    delay = 1.0
+    while True:
+        step = "mongo"
+        try:
+            await ping_mongo()
+            startup_state["mongo"] = "ok"
+            open_connections = await warm_pool(settings.MONGO_MIN_POOL_SIZE)
+            print(f"✅ MongoDB pool warmed ({open_connections} connections open)")
+            
+            step = "indexes"
+            await ensure_indexes(await get_database())
+            startup_state["indexes"] = "ok"
+            print("✅ Database indexes ensured")
+            return
+        except Exception as e:
+            startup_state[step] = "error"
+            print(f"❌ MongoDB warm-up failed at {step}: {e}. Retrying in {delay:.0f} seconds...")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, WARM_UP_MAX_DELAY_SECONDS)
+
+async def _preload_chat():
+    if settings.CHAT_PRELOAD:
+        try:
+            await chat.get_chatbot()
+            await load_encoding()
+            startup_state["chat"] = "ok"
+            print("✅ AI chatbot loaded")
+        except Exception as e:
+            startup_state["chat"] = "error"
+            print(f"⚠️ Error loading AI chatbot: {e}")
+
+async def warm_up():
+    """Database warm-up and the chat stack import, run concurrently after the app starts accepting traffic"""
+    await asyncio.gather(_warm_database(), _preload_chat())
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    settings.print_config()
     try:
         await connect_to_mongo()
-        print("✅ Successfully connected to MongoDB")
     except Exception as e:
-        print(f"❌ Failed to connect to MongoDB: {e}")
+        print(f"❌ Failed to configure MongoDB: {e}")
         raise
         
+    await smtp_pool.start()
+    outbox.start(send_email)
+    print("✅ Email outbox workers started")
+    
+    if settings.REMINDER_DISPATCH == "events":
+        reminder_dispatcher.start()
+        print("✅ Reminder dispatcher started")
+        
     try:
         start_scheduler()
         print("✅ Scheduler started successfully")
@@ -22,15 +88,33 @@ async def lifespan(app: FastAPI):
         print(f"❌ Failed to start scheduler: {e}")
         raise
         
+    warm_up_task = asyncio.create_task(warm_up())
+        
     yield
     
     # Shutdown
+    warm_up_task.cancel()
+    await asyncio.gather(warm_up_task, return_exceptions=True)
+    
     try:
         stop_scheduler()
         print("🛑 Scheduler stopped")
     except Exception as e:
         print(f"⚠️ Error stopping scheduler: {e}")
         
+    try:
+        await deregister(await get_database())
+    except Exception as e:
+        print(f"⚠️ Error deregistering scheduler instance: {e}")
+        
+    await reminder_dispatcher.stop()
+    await outbox.stop()
+    await smtp_pool.stop()
+    print("🛑 Email outbox workers stopped")
+        
+    await conversation_memory.close()
+    shutdown_password_pool()
+        
     try:
         await close_mongo_connection()
         print("🛑 MongoDB connection closed")
@@ -57,8 +141,8 @@ app.add_middleware(
     allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["Content-Type", "Authorization", "Accept"],
-    expose_headers=["Content-Type", "Content-Length", "Authorization"],
+    allow_headers=["Content-Type", "Authorization", "Accept", "If-None-Match"],
+    expose_headers=["Content-Type", "Content-Length", "Authorization", "X-Next-Cursor", "ETag"],
     max_age=600  # Cache preflight response for 10 minutes
 )
 
@@ -72,7 +156,7 @@ async def add_cors_headers(request: Request, call_next):
             headers={
                 "Access-Control-Allow-Origin": request.headers.get("Origin", ""),
                 "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization",
+                "Access-Control-Allow-Headers": "Content-Type, Authorization, Accept, If-None-Match",
                 "Access-Control-Allow-Credentials": "true",
                 "Access-Control-Max-Age": "600",  # 10 minutes
             },
@@ -106,5 +190,18 @@ async def root():
     }
 
 @app.get("/health")
-async def health_check():
-    return {"status": "healthy"}
+async def health_check(response: Response):
+    """Healthy once MongoDB is reachable and its indexes and capped collections exist"""
+    if startup_state["indexes"] != "ok":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "starting", "startup": startup_state}
+    return {"status": "healthy", "startup": startup_state}
+
+@app.get("/health/db")
+async def database_pool_stats():
+    """Connection pool usage in this process, for sizing MONGO_MAX_POOL_SIZE and MONGO_MIN_POOL_SIZE"""
+    return {
+        "max_pool_size": settings.MONGO_MAX_POOL_SIZE,
+        "min_pool_size": settings.MONGO_MIN_POOL_SIZE,
+        "pool": pool_stats.stats(),
+    }
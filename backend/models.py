@@ -48,6 +48,9 @@ class UserResponse(BaseModel):
     class Config:
         populate_by_name = True
 
+class NotificationPreferences(BaseModel):
+    email_digest: bool
+
 # Course Models
 class CourseBase(BaseModel):
     course_name: str
@@ -0,0 +1,77 @@
+import base64
+from typing import List, Optional, Tuple
+from bson import json_util
+from fastapi import HTTPException, Response
+from pymongo import ASCENDING
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(document: dict, sort_field: Optional[str]) -> str:
+    """Build an opaque continuation token from the last document of a page"""
+    key = {"id": document["_id"]}
+    if sort_field:
+        key["v"] = document.get(sort_field)
+    raw = json_util.dumps(key).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+        if "id" not in key:
+            raise ValueError("missing id")
+        return key
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_filter(sort_field: Optional[str], cursor: str) -> dict:
+    """Filter selecting the documents strictly after the cursor in (sort_field, _id) order"""
+    key = decode_cursor(cursor)
+    if not sort_field:
+        return {"_id": {"$gt": key["id"]}}
+    return {"$or": [
+        {sort_field: {"$gt": key.get("v")}},
+        {sort_field: key.get("v"), "_id": {"$gt": key["id"]}},
+    ]}
+
+def sort_spec(sort_field: Optional[str]) -> list:
+    if not sort_field:
+        return [("_id", ASCENDING)]
+    return [(sort_field, ASCENDING), ("_id", ASCENDING)]
+
+async def fetch_page(
+    collection,
+    query: dict,
+    sort_field: Optional[str],
+    limit: int,
+    cursor: Optional[str] = None,
+    session=None,
+) -> Tuple[List[dict], Optional[str]]:
+    """Fetch one page ordered by (sort_field, _id).
+
+    Returns the documents and the continuation token for the next page, or
+    None when this is the last page.
+    """
+    if cursor:
+        query = {**query, **keyset_filter(sort_field, cursor)}
+
+    documents = await collection.find(query, session=session).sort(sort_spec(sort_field)).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1], sort_field)
+    return documents, next_cursor
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+def date_window(field: str, after=None, before=None) -> dict:
+    """Query fragment for after <= field < before, omitting open ends"""
+    window = {}
+    if after is not None:
+        window["$gte"] = after
+    if before is not None:
+        window["$lt"] = before
+    return {field: window} if window else {}
@@ -0,0 +1,49 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+from backend.config import settings
+
+# Hashes with fewer rounds than BCRYPT_ROUNDS are reported as needing an update,
+# so raising the cost upgrades stored hashes as users log in.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+)
+
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop
+_executor: Optional[ThreadPoolExecutor] = None
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            thread_name_prefix="password-hash",
+        )
+    return _executor
+
+async def hash_password(password: str) -> str:
+    """Hash a password in the worker pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), pwd_context.hash, password)
+
+async def verify_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password in the worker pool.
+
+    Returns (valid, new_hash). new_hash is set when the password is valid but
+    the stored hash uses an outdated cost and should be replaced.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(), pwd_context.verify_and_update, plain_password, hashed_password
+    )
+
+def shutdown_password_pool() -> None:
+    """Stop the worker pool, waiting for in-flight hashes"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import deque
+from typing import Deque
+from pymongo import monitoring
+
+# Connection creations counted for the per-minute rate
+_RATE_WINDOW_SECONDS = 60
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Connection pool counters for sizing maxPoolSize/minPoolSize from data.
+
+    PyMongo calls these hooks synchronously from whichever thread checks out
+    a connection, so the state is guarded by a lock and the checkout start
+    is remembered per thread (the 4.5 driver has no duration on the event).
+    """
+
+    def __init__(self, samples: int = 2000):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.open = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.created = 0
+        self.closed = 0
+        self.checkouts = 0
+        self.checkout_failures = {}
+        self.pools_cleared = 0
+        self._waits: Deque[float] = deque(maxlen=samples)
+        self._created_at: Deque[float] = deque()
+
+    # Pool lifecycle
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    # Connections
+
+    def connection_created(self, event):
+        now = time.monotonic()
+        with self._lock:
+            self.created += 1
+            self.open += 1
+            self._created_at.append(now)
+            while self._created_at and self._created_at[0] < now - _RATE_WINDOW_SECONDS:
+                self._created_at.popleft()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.closed += 1
+            self.open = max(0, self.open - 1)
+
+    # Checkouts
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.monotonic()
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        with self._lock:
+            self.checkout_failures[event.reason] = self.checkout_failures.get(event.reason, 0) + 1
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            if started is not None:
+                self._waits.append(time.monotonic() - started)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            now = time.monotonic()
+            created_last_minute = sum(1 for at in self._created_at if at >= now - _RATE_WINDOW_SECONDS)
+
+            def percentile(fraction: float) -> float:
+                return round(waits[min(len(waits) - 1, int(len(waits) * fraction))] * 1000, 2) if waits else 0.0
+
+            return {
+                "open": self.open,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "created": self.created,
+                "closed": self.closed,
+                "created_last_minute": created_last_minute,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "pools_cleared": self.pools_cleared,
+                "checkout_wait_ms_p50": percentile(0.5),
+                "checkout_wait_ms_p95": percentile(0.95),
+                "checkout_wait_ms_p99": percentile(0.99),
+                "checkout_wait_ms_max": round(waits[-1] * 1000, 2) if waits else 0.0,
+            }
+
+# Create a singleton instance
+pool_stats = PoolStatsListener()
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+from bson import ObjectId
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+from backend.config import settings
+from backend.database import get_database
+from backend.course_resolver import resolve_course_names, UNKNOWN_COURSE
+from backend.coordination import acquire_lease, complete_lease
+from backend.email_service import render_assignment_reminder
+from backend.email_outbox import enqueue_emails, PRIORITY_BULK
+from backend.email_digest import add_many_to_digest, wants_digest, KIND_REMINDER
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_CLAIMED = "claimed"
+STATUS_SENT = "sent"
+STATUS_CANCELLED = "cancelled"
+
+# Duplicate key: the event for this horizon already fired and must not be re-armed
+_DUPLICATE_KEY = 11000
+
+def reminder_key(assignment_id: ObjectId, horizon_hours: float) -> str:
+    """One reminder of an assignment: its event id, and the dedupe key of the email it queues"""
+    return f"{assignment_id}:{horizon_hours:g}h"
+
+async def schedule_reminders(db, assignment: dict) -> None:
+    """Bring an assignment's reminder events in line with its current state.
+
+    Each configured horizon gets one event, keyed by assignment and horizon,
+    firing that many hours before the due date. Horizons already in the past
+    are skipped, completed assignments have their pending events cancelled,
+    and horizons that already fired are left alone so they fire at most once.
+    """
+    if assignment.get("completed"):
+        await cancel_reminders(db, assignment["_id"])
+        return
+
+    now = datetime.utcnow()
+    due_date = assignment["due_date"]
+    upcoming = {}
+    for horizon in settings.REMINDER_HORIZONS_HOURS:
+        fire_at = due_date - timedelta(hours=horizon)
+        if fire_at > now:
+            upcoming[reminder_key(assignment["_id"], horizon)] = (horizon, fire_at)
+
+    # Horizons that moved into the past (e.g. the due date was brought forward)
+    await db.reminder_events.delete_many({
+        "assignment_id": assignment["_id"],
+        "status": STATUS_PENDING,
+        "_id": {"$nin": list(upcoming)},
+    })
+    if not upcoming:
+        return
+
+    try:
+        await db.reminder_events.bulk_write([
+            UpdateOne(
+                {"_id": event_id, "status": STATUS_PENDING},
+                {
+                    "$set": {"fire_at": fire_at},
+                    "$setOnInsert": {
+                        "assignment_id": assignment["_id"],
+                        "user_id": assignment["user_id"],
+                        "horizon_hours": horizon,
+                        "created_at": now,
+                    },
+                },
+                upsert=True
+            )
+            for event_id, (horizon, fire_at) in upcoming.items()
+        ], ordered=False)
+    except BulkWriteError as e:
+        if any(error["code"] != _DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+            raise
+    reminder_dispatcher.wake()
+
+async def cancel_reminders(db, assignment_id: ObjectId) -> None:
+    """Drop an assignment's reminders that have not fired yet"""
+    await db.reminder_events.delete_many({"assignment_id": assignment_id, "status": STATUS_PENDING})
+
+def _hours_left(horizon_hours: float) -> str:
+    if horizon_hours >= 24 and horizon_hours % 24 == 0:
+        days = int(horizon_hours // 24)
+        return f"{days} day{'s' if days != 1 else ''}"
+    return f"{horizon_hours:g} hour{'s' if horizon_hours != 1 else ''}"
+
+class ReminderDispatcher:
+    """Fires reminder events as they come due.
+
+    Events live in the reminder_events collection ordered by fire_at, so a
+    restarted process simply resumes from Mongo. Due events are claimed in
+    batches with a lease, which lets several app instances dispatch side by
+    side without sending anything twice; events whose claimant died are
+    returned to the queue once the lease expires.
+    """
+
+    def __init__(self):
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._backfill: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="reminder-dispatcher")
+        self._backfill = asyncio.create_task(self._backfill_once(), name="reminder-backfill")
+
+    async def stop(self) -> None:
+        tasks = [task for task in (self._task, self._backfill) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = self._backfill = None
+
+    def wake(self) -> None:
+        """Re-evaluate the next due time, e.g. after an earlier event was added"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _requeue_stale(self, db) -> None:
+        await db.reminder_events.update_many(
+            {"status": STATUS_CLAIMED, "locked_until": {"$lte": datetime.utcnow()}},
+            {"$set": {"status": STATUS_PENDING}, "$unset": {"claim": "", "locked_until": ""}}
+        )
+
+    async def _claim(self, db) -> List[dict]:
+        now = datetime.utcnow()
+        due = await db.reminder_events.find(
+            {"status": STATUS_PENDING, "fire_at": {"$lte": now}}, {"_id": 1}
+        ).sort("fire_at", ASCENDING).limit(settings.REMINDER_BATCH_SIZE).to_list(length=None)
+        if not due:
+            return []
+        claim = uuid.uuid4().hex
+        await db.reminder_events.update_many(
+            {"_id": {"$in": [event["_id"] for event in due]}, "status": STATUS_PENDING},
+            {"$set": {
+                "status": STATUS_CLAIMED,
+                "claim": claim,
+                "locked_until": now + timedelta(seconds=settings.EMAIL_LOCK_SECONDS),
+            }}
+        )
+        return await db.reminder_events.find({"claim": claim}).to_list(length=None)
+
+    async def _dispatch(self, db, events: List[dict]) -> None:
+        """Queue the reminders for a claimed batch and record the outcome of each event"""
+        now = datetime.utcnow()
+        assignments = {
+            doc["_id"]: doc async for doc in db.assignments.find(
+                {"_id": {"$in": list({event["assignment_id"] for event in events})}, "completed": False},
+                {"title": 1, "course_id": 1, "due_date": 1}
+            )
+        }
+        user_ids = [ObjectId(event["user_id"]) for event in events if ObjectId.is_valid(event["user_id"])]
+        users = {
+            str(doc["_id"]): doc async for doc in db.users.find({"_id": {"$in": user_ids}}, {"email": 1, "email_digest": 1})
+        }
+        course_names = await resolve_course_names(db, [doc.get("course_id") for doc in assignments.values()])
+
+        messages, held, sent, cancelled, rearmed = [], [], [], [], []
+        for event in events:
+            assignment = assignments.get(event["assignment_id"])
+            user = users.get(event["user_id"])
+            if assignment is None or user is None or assignment["due_date"] <= now:
+                cancelled.append(event["_id"])
+                continue
+            fire_at = assignment["due_date"] - timedelta(hours=event["horizon_hours"])
+            if fire_at > now + timedelta(minutes=1):
+                # The due date moved later while this event was claimed
+                rearmed.append(UpdateOne({"_id": event["_id"]}, {
+                    "$set": {"status": STATUS_PENDING, "fire_at": fire_at},
+                    "$unset": {"claim": "", "locked_until": ""},
+                }))
+                continue
+
+            subject, body = render_assignment_reminder(
+                assignment["title"],
+                course_names.get(str(assignment.get("course_id")), UNKNOWN_COURSE),
+                assignment["due_date"],
+                _hours_left(event["horizon_hours"])
+            )
+            # Keyed by event, so a batch re-dispatched after a partial failure is not sent twice
+            if wants_digest(user):
+                held.append((user["email"], KIND_REMINDER, subject, body, event["_id"]))
+            else:
+                messages.append((user["email"], subject, body, event["_id"]))
+            sent.append(event["_id"])
+
+        await enqueue_emails(messages, PRIORITY_BULK)
+        await add_many_to_digest(held, PRIORITY_BULK)
+
+        finished = datetime.utcnow()
+        updates = [
+            UpdateOne({"_id": {"$in": ids}}, {"$set": {"status": status, "finished_at": finished}, "$unset": {"locked_until": ""}})
+            for ids, status in ((sent, STATUS_SENT), (cancelled, STATUS_CANCELLED))
+            if ids
+        ] + rearmed
+        if updates:
+            await db.reminder_events.bulk_write(updates, ordered=False)
+        logger.info(f"⏰ Reminder events: {len(sent)} sent, {len(cancelled)} cancelled, {len(rearmed)} re-armed")
+
+    async def _seconds_until_next(self, db) -> float:
+        upcoming = await db.reminder_events.find_one(
+            {"status": STATUS_PENDING}, {"fire_at": 1}, sort=[("fire_at", ASCENDING)]
+        )
+        delay = settings.REMINDER_MAX_SLEEP_SECONDS
+        if upcoming is not None:
+            delay = min(delay, (upcoming["fire_at"] - datetime.utcnow()).total_seconds())
+        return max(0.0, delay)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                db = await get_database()
+                await self._requeue_stale(db)
+                events = await self._claim(db)
+                if events:
+                    await self._dispatch(db, events)
+                    continue
+                delay = await self._seconds_until_next(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"⚠️ Reminder dispatcher error: {e}")
+                delay = settings.REMINDER_MAX_SLEEP_SECONDS
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _backfill_once(self) -> None:
+        """Create events for open assignments that predate the queue, once per day cluster-wide"""
+        try:
+            db = await get_database()
+            lease = f"reminder_events:backfill:{datetime.utcnow():%Y-%m-%d}"
+            if not await acquire_lease(db, lease):
+                return
+            scheduled = 0
+            cursor = db.assignments.find(
+                {"completed": False, "due_date": {"$gt": datetime.utcnow()}},
+                {"user_id": 1, "due_date": 1, "completed": 1}
+            )
+            async for assignment in cursor:
+                await schedule_reminders(db, assignment)
+                scheduled += 1
+            await complete_lease(db, lease)
+            logger.info(f"⏰ Reminder backfill checked {scheduled} open assignments")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"⚠️ Reminder backfill failed: {e}")
+
+# Create a singleton instance
+reminder_dispatcher = ReminderDispatcher()
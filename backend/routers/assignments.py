@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from typing import List, Optional
 from backend.models import AssignmentCreate, AssignmentResponse
 from backend.auth import get_current_user_id, get_current_user
-from backend.database import get_database
+from backend.database import get_database, read_session, read_caught_up
+from motor.motor_asyncio import AsyncIOMotorClientSession
 from bson import ObjectId
+from pymongo import ReturnDocument
 from backend.email_service import send_assignment_notification
+from backend.course_resolver import resolve_course_names, resolve_course_name, UNKNOWN_COURSE
+from backend.pagination import fetch_page, set_next_cursor, date_window, keyset_filter, sort_spec
+from backend.streaming import wants_ndjson, ndjson_response
+from backend.collection_versions import bump_version, conditional_get, cache_headers
+from backend.serialization import serialize_assignment, render
+from backend.config import settings
+from backend.coordination import user_bucket
+from backend.reminder_queue import schedule_reminders, cancel_reminders
 from datetime import datetime
 
 router = APIRouter(prefix="/api/assignments", tags=["Assignments"])
@@ -12,6 +22,7 @@ router = APIRouter(prefix="/api/assignments", tags=["Assignments"])
 @router.post("/", response_model=AssignmentResponse)
 async def create_assignment(
     assignment: AssignmentCreate,
+    request: Request,
     user_id: str = Depends(get_current_user_id),
     current_user: dict = Depends(get_current_user)
 ):
@@ -32,65 +43,103 @@ async def create_assignment(
     
     assignment_dict = assignment.dict()
     assignment_dict["user_id"] = user_id
+    assignment_dict["user_bucket"] = user_bucket(user_id)
     assignment_dict["completed"] = False
     assignment_dict["reminder_sent"] = False
     assignment_dict["created_at"] = datetime.utcnow()
     
-    result = await db.assignments.insert_one(assignment_dict)
-    created_assignment = await db.assignments.find_one({"_id": result.inserted_id})
+    # insert_one sets _id on assignment_dict, so the response is built locally
+    await db.assignments.insert_one(assignment_dict)
+    await bump_version(db, user_id, "assignments")
+    await schedule_reminders(db, assignment_dict)
+    created_assignment = assignment_dict
     
     # Send email notification
     try:
         await send_assignment_notification(
-            user_email=current_user["email"],
+            user=current_user,
             assignment_title=created_assignment["title"],
             course_name=course["course_name"],
             due_date=created_assignment["due_date"]
         )
     except Exception as e:
-        print(f"Failed to send email notification: {str(e)}")
-    
-    return AssignmentResponse(
-        id=str(created_assignment["_id"]),
-        title=created_assignment["title"],
-        description=created_assignment.get("description"),
-        course_id=str(created_assignment["course_id"]),
-        course_name=course["course_name"],
-        due_date=created_assignment["due_date"],
-        priority=created_assignment["priority"],
-        completed=created_assignment["completed"],
-        created_at=created_assignment.get("created_at", datetime.utcnow())
-    )
+        print(f"Failed to queue email notification: {str(e)}")
+    
+    return render(request, serialize_assignment(created_assignment, course_name=course["course_name"]))
 
 @router.get("/", response_model=List[AssignmentResponse])
-async def get_assignments(user_id: str = Depends(get_current_user_id)):
-    """Get all assignments for the current user"""
-    db = await get_database()
+async def get_assignments(
+    request: Request,
+    response: Response,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    completed: Optional[bool] = None,
+    priority: Optional[str] = None,
+    course_id: Optional[str] = None,
+    due_after: Optional[datetime] = None,
+    due_before: Optional[datetime] = None,
+    user_id: str = Depends(get_current_user_id),
+    session: Optional[AsyncIOMotorClientSession] = Depends(read_session)
+):
+    """Get a page of assignments for the current user, ordered by due date.
     
-    assignments = await db.assignments.find({"user_id": user_id}).sort("due_date", 1).to_list(length=None)
+    The continuation token for the next page is returned in the X-Next-Cursor header.
+    Clients sending Accept: application/x-ndjson receive every matching assignment
+    as a stream instead, one JSON object per line.
+    """
+    db = await get_database()
     
-    result = []
-    for assignment in assignments:
-        course = await db.courses.find_one({"_id": ObjectId(assignment["course_id"])})
-        course_name = course["course_name"] if course else "Unknown Course"
+    not_modified = await conditional_get(request, response, db, user_id, ("assignments", "courses"), session)
+    if not_modified:
+        return not_modified
+    
+    query = {"user_id": user_id, **date_window("due_date", due_after, due_before)}
+    if completed is not None:
+        query["completed"] = completed
+    if priority is not None:
+        query["priority"] = priority
+    if course_id is not None:
+        query["course_id"] = course_id
+    
+    if wants_ndjson(request):
+        if cursor:
+            query.update(keyset_filter("due_date", cursor))
+        
+        async def serialize_batch(batch):
+            return await _build_assignment_list(db, batch)
         
-        result.append(AssignmentResponse(
-            id=str(assignment["_id"]),
-            title=assignment["title"],
-            description=assignment.get("description"),
-            course_id=str(assignment["course_id"]),
-            course_name=course_name,
-            due_date=assignment["due_date"],
-            priority=assignment["priority"],
-            completed=assignment["completed"],
-            created_at=assignment.get("created_at", datetime.utcnow())
-        ))
-    
-    return result
+        return ndjson_response(
+            db.assignments.find(query).sort(sort_spec("due_date")),
+            serialize_batch,
+            settings.STREAM_BATCH_SIZE,
+            headers=cache_headers(response)
+        )
+    
+    async def read_page(source):
+        page, next_cursor = await fetch_page(source.assignments, query, "due_date", limit, cursor, session)
+        return await _build_assignment_list(source, page, session), next_cursor
+    
+    items, next_cursor = await read_caught_up(read_page, session)
+    set_next_cursor(response, next_cursor)
+    return render(request, items, response)
+
+async def _build_assignment_list(db, assignments: List[dict], session=None) -> List[dict]:
+    """Build responses for a batch of assignments, resolving course names in one query"""
+    course_names = await resolve_course_names(db, (a["course_id"] for a in assignments), session=session)
+    
+    return [
+        serialize_assignment(
+            assignment,
+            course_name=course_names.get(str(assignment["course_id"]), UNKNOWN_COURSE)
+        )
+        for assignment in assignments
+    ]
 
 @router.get("/{assignment_id}", response_model=AssignmentResponse)
 async def get_assignment(
     assignment_id: str,
+    request: Request,
+    response: Response,
     user_id: str = Depends(get_current_user_id)
 ):
     """Get a specific assignment"""
@@ -99,6 +148,10 @@ async def get_assignment(
     if not ObjectId.is_valid(assignment_id):
         raise HTTPException(status_code=400, detail="Invalid assignment ID")
     
+    not_modified = await conditional_get(request, response, db, user_id, ("assignments", "courses"))
+    if not_modified:
+        return not_modified
+    
     assignment = await db.assignments.find_one({
         "_id": ObjectId(assignment_id),
         "user_id": user_id
@@ -107,25 +160,15 @@ async def get_assignment(
     if not assignment:
         raise HTTPException(status_code=404, detail="Assignment not found")
     
-    course = await db.courses.find_one({"_id": ObjectId(assignment["course_id"])})
-    course_name = course["course_name"] if course else "Unknown Course"
-    
-    return AssignmentResponse(
-        id=str(assignment["_id"]),
-        title=assignment["title"],
-        description=assignment.get("description"),
-        course_id=str(assignment["course_id"]),
-        course_name=course_name,
-        due_date=assignment["due_date"],
-        priority=assignment["priority"],
-        completed=assignment["completed"],
-        created_at=assignment.get("created_at", datetime.utcnow())
-    )
+    course_name = await resolve_course_name(db, assignment["course_id"]) or UNKNOWN_COURSE
+    
+    return render(request, serialize_assignment(assignment, course_name=course_name), response)
 
 @router.put("/{assignment_id}", response_model=AssignmentResponse)
 async def update_assignment(
     assignment_id: str,
     assignment: AssignmentCreate,
+    request: Request,
     user_id: str = Depends(get_current_user_id)
 ):
     """Update an assignment"""
@@ -146,27 +189,19 @@ async def update_assignment(
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     
-    result = await db.assignments.update_one(
+    updated_assignment = await db.assignments.find_one_and_update(
         {"_id": ObjectId(assignment_id), "user_id": user_id},
-        {"$set": assignment.dict()}
+        {"$set": assignment.dict()},
+        return_document=ReturnDocument.AFTER
     )
     
-    if result.matched_count == 0:
+    if updated_assignment is None:
         raise HTTPException(status_code=404, detail="Assignment not found")
     
-    updated_assignment = await db.assignments.find_one({"_id": ObjectId(assignment_id)})
-    
-    return AssignmentResponse(
-        id=str(updated_assignment["_id"]),
-        title=updated_assignment["title"],
-        description=updated_assignment.get("description"),
-        course_id=str(updated_assignment["course_id"]),
-        course_name=course["course_name"],
-        due_date=updated_assignment["due_date"],
-        priority=updated_assignment["priority"],
-        completed=updated_assignment["completed"],
-        created_at=updated_assignment.get("created_at", datetime.utcnow())
-    )
+    await bump_version(db, user_id, "assignments")
+    await schedule_reminders(db, updated_assignment)
+    
+    return render(request, serialize_assignment(updated_assignment, course_name=course["course_name"]))
 
 @router.patch("/{assignment_id}/complete")
 async def toggle_assignment_completion(
@@ -179,22 +214,21 @@ async def toggle_assignment_completion(
     if not ObjectId.is_valid(assignment_id):
         raise HTTPException(status_code=400, detail="Invalid assignment ID")
     
-    assignment = await db.assignments.find_one({
-        "_id": ObjectId(assignment_id),
-        "user_id": user_id
-    })
+    # Flip the flag server-side in one atomic pipeline update
+    assignment = await db.assignments.find_one_and_update(
+        {"_id": ObjectId(assignment_id), "user_id": user_id},
+        [{"$set": {"completed": {"$not": ["$completed"]}}}],
+        projection={"completed": 1, "due_date": 1, "user_id": 1},
+        return_document=ReturnDocument.AFTER
+    )
     
-    if not assignment:
+    if assignment is None:
         raise HTTPException(status_code=404, detail="Assignment not found")
     
-    new_status = not assignment.get("completed", False)
-    
-    await db.assignments.update_one(
-        {"_id": ObjectId(assignment_id)},
-        {"$set": {"completed": new_status}}
-    )
+    await bump_version(db, user_id, "assignments")
+    await schedule_reminders(db, assignment)
     
-    return {"message": "Assignment status updated", "completed": new_status}
+    return {"message": "Assignment status updated", "completed": assignment["completed"]}
 
 @router.delete("/{assignment_id}")
 async def delete_assignment(
@@ -215,4 +249,6 @@ async def delete_assignment(
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Assignment not found")
     
+    await bump_version(db, user_id, "assignments")
+    await cancel_reminders(db, ObjectId(assignment_id))
     return {"message": "Assignment deleted successfully"}
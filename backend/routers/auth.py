@@ -1,39 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
-from backend.models import UserCreate, UserResponse, Token, User
-from backend.auth_utils import get_password_hash, verify_password, create_access_token, get_current_user
+from backend.models import UserCreate, UserResponse, Token, User, NotificationPreferences
+from backend.passwords import hash_password, verify_password
+from backend.auth import create_user_access_token, get_current_user, revoke_user_tokens, forget_cached_user
 from backend.database import get_database
 from backend.config import settings
+from backend.serialization import serialize_user, render
+from backend.email_digest import wants_digest
+from backend.indexes import required_indexes_ready
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
 @router.post("/register", response_model=UserResponse)
-async def register(user: UserCreate):
+async def register(user: UserCreate, request: Request):
     """Register a new user"""
     db = await get_database()
     
-    # Check if user already exists
-    existing_user = await db.users.find_one({"email": user.email})
-    if existing_user:
+    # Duplicate emails are only rejected once the unique index exists
+    if not await required_indexes_ready(db):
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Registration is not available yet, try again shortly"
         )
     
-    # Create new user
+    # Create new user; the unique email index rejects existing addresses
     user_dict = user.dict()
-    user_dict["hashed_password"] = get_password_hash(user_dict.pop("password"))
+    user_dict["hashed_password"] = await hash_password(user_dict.pop("password"))
+    user_dict["token_version"] = 0
     
-    result = await db.users.insert_one(user_dict)
-    created_user = await db.users.find_one({"_id": result.inserted_id})
+    try:
+        await db.users.insert_one(user_dict)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     
-    return UserResponse(
-        id=str(created_user["_id"]),
-        email=created_user["email"],
-        full_name=created_user["full_name"]
-    )
+    # insert_one sets _id on user_dict
+    return render(request, serialize_user(user_dict))
 
 @router.post("/login", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
@@ -42,60 +49,49 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     
     # Find user
     user = await db.users.find_one({"email": form_data.username})
-    if not user or not verify_password(form_data.password, user["hashed_password"]):
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await verify_password(form_data.password, user["hashed_password"])
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Upgrade hashes stored with an outdated cost factor
+    if new_hash:
+        await db.users.update_one({"_id": user["_id"]}, {"$set": {"hashed_password": new_hash}})
+    
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user["email"]}, expires_delta=access_token_expires
-    )
+    access_token = create_user_access_token(user, expires_delta=access_token_expires)
     
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: dict = Depends(get_current_user)):
+async def get_current_user_info(request: Request, current_user: dict = Depends(get_current_user)):
     """Get current user information"""
-    if not current_user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
+    return render(request, serialize_user(current_user))
+
+@router.get("/me/preferences", response_model=NotificationPreferences)
+async def get_notification_preferences(current_user: dict = Depends(get_current_user)):
+    """Get the current user's notification preferences"""
+    return {"email_digest": wants_digest(current_user)}
+
+@router.put("/me/preferences", response_model=NotificationPreferences)
+async def update_notification_preferences(
+    preferences: NotificationPreferences,
+    current_user: dict = Depends(get_current_user)
+):
+    """Choose between digest emails and immediate delivery"""
     db = await get_database()
-    
-    # If _id is a string, try to convert it to ObjectId
-    user_id = current_user.get("_id")
-    if isinstance(user_id, str):
-        try:
-            user_id = ObjectId(user_id)
-        except:
-            pass
-    
-    # Try to get the user by _id or email
-    user = None
-    if user_id:
-        user = await db.users.find_one({"_id": user_id})
-    
-    if not user and current_user.get("email"):
-        user = await db.users.find_one({"email": current_user.get("email")})
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
-    # Convert ObjectId to string for the response
-    user["_id"] = str(user["_id"])
-    
-    return UserResponse(
-        id=user["_id"],
-        email=user.get("email", ""),
-        full_name=user.get("full_name", "")
-    )
+    await db.users.update_one({"_id": current_user["_id"]}, {"$set": {"email_digest": preferences.email_digest}})
+    forget_cached_user(str(current_user["_id"]))
+    return {"email_digest": preferences.email_digest}
+
+@router.post("/logout-all")
+async def logout_all_sessions(current_user: dict = Depends(get_current_user)):
+    """Revoke every token issued to the current user"""
+    await revoke_user_tokens(str(current_user["_id"]))
+    return {"message": "All sessions have been signed out"}
@@ -1,21 +1,96 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import importlib
+import sys
+from fastapi import APIRouter, Depends, HTTPException, Request
+from datetime import datetime
 from backend.models import ChatMessage, ChatResponse
 from backend.auth import get_current_user_id
-from backend.ai_chatbot import chatbot
+from backend.conversation import conversation_memory
+from backend.llm_cache import llm_cache
+from backend.llm_limiter import llm_limiter, LLMError
+from backend.serialization import render
+from backend.streaming import sse_event, sse_response
+from backend.config import settings
 
 router = APIRouter(prefix="/api/chat", tags=["AI Chatbot"])
 
+CHATBOT_MODULE = "backend.ai_chatbot"
+
+async def get_chatbot():
+    """The chatbot, imported on first use in a worker thread.
+
+    backend.ai_chatbot pulls in LangChain and LangGraph, which would block the
+    event loop for a second or more; startup preloads it in the background.
+    """
+    module = sys.modules.get(CHATBOT_MODULE)
+    if module is None:
+        module = await asyncio.to_thread(importlib.import_module, CHATBOT_MODULE)
+    return module.chatbot
+
+def _llm_http_error(error: LLMError) -> HTTPException:
+    headers = {"Retry-After": str(settings.CHAT_LLM_RETRY_AFTER_SECONDS)} if error.status_code in (429, 503) else None
+    return HTTPException(status_code=error.status_code, detail=error.detail, headers=headers)
+
 @router.post("/", response_model=ChatResponse)
 async def chat_with_ai(
     message: ChatMessage,
+    request: Request,
     user_id: str = Depends(get_current_user_id)
 ):
     """Chat with the AI academic planning assistant"""
     try:
+        chatbot = await get_chatbot()
         response = await chatbot.chat(user_id, message.message)
-        return ChatResponse(response=response)
+        return render(request, {"response": response, "timestamp": datetime.utcnow()})
+    except LLMError as e:
+        raise _llm_http_error(e)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error processing chat request: {str(e)}"
         )
+
+@router.post("/stream")
+async def stream_chat_with_ai(
+    message: ChatMessage,
+    request: Request,
+    user_id: str = Depends(get_current_user_id)
+):
+    """Chat with the AI assistant, receiving the reply as server-sent events.
+    
+    Emits `token` events ({"delta": ...}) as text is generated, then a
+    `done` event, or an `error` event if generation fails. Disconnecting
+    stops the generation.
+    """
+    # Reject before the stream starts while a status code can still be sent
+    try:
+        llm_limiter.check_admission()
+    except LLMError as e:
+        raise _llm_http_error(e)
+    chatbot = await get_chatbot()
+    
+    async def events():
+        try:
+            async for delta in chatbot.stream_chat(user_id, message.message):
+                yield sse_event({"delta": delta}, "token")
+        except LLMError as e:
+            yield sse_event({"detail": e.detail, "status": e.status_code}, "error")
+            return
+        except Exception as e:
+            print(f"Chat stream error: {str(e)}")
+            yield sse_event({"detail": "Error processing chat request"}, "error")
+            return
+        yield sse_event({"timestamp": datetime.utcnow().isoformat()}, "done")
+    
+    return sse_response(request, events(), settings.SSE_HEARTBEAT_SECONDS)
+
+@router.delete("/history")
+async def clear_chat_history(user_id: str = Depends(get_current_user_id)):
+    """Start a fresh conversation with the AI assistant"""
+    await conversation_memory.clear(user_id)
+    return {"message": "Conversation history cleared"}
+
+@router.get("/stats")
+async def get_chat_stats(user_id: str = Depends(get_current_user_id)):
+    """Response cache and model admission counters for this process"""
+    return {"cache": llm_cache.stats(), "limiter": llm_limiter.stats()}
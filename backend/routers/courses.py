@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from typing import List, Optional
 from backend.models import CourseCreate, CourseResponse
 from backend.auth import get_current_user_id
-from backend.database import get_database
+from backend.database import get_database, read_session, read_caught_up
+from motor.motor_asyncio import AsyncIOMotorClientSession
+from backend.pagination import fetch_page, set_next_cursor, keyset_filter, sort_spec
+from backend.streaming import wants_ndjson, ndjson_response
+from backend.collection_versions import bump_version, conditional_get, cache_headers
+from backend.serialization import serialize_course, render
+from backend.config import settings
 from bson import ObjectId
+from pymongo import ReturnDocument
 from datetime import datetime
 
 router = APIRouter(prefix="/api/courses", tags=["Courses"])
@@ -11,6 +18,7 @@ router = APIRouter(prefix="/api/courses", tags=["Courses"])
 @router.post("/", response_model=CourseResponse)
 async def create_course(
     course: CourseCreate,
+    request: Request,
     user_id: str = Depends(get_current_user_id)
 ):
     """Create a new course"""
@@ -20,40 +28,63 @@ async def create_course(
     course_dict["user_id"] = user_id
     course_dict["created_at"] = datetime.utcnow()
     
-    result = await db.courses.insert_one(course_dict)
-    created_course = await db.courses.find_one({"_id": result.inserted_id})
+    # insert_one sets _id on course_dict, so the response is built locally
+    await db.courses.insert_one(course_dict)
+    await bump_version(db, user_id, "courses")
     
-    return CourseResponse(
-        id=str(created_course["_id"]),
-        course_name=created_course["course_name"],
-        course_code=created_course.get("course_code"),
-        instructor=created_course.get("instructor"),
-        description=created_course.get("description"),
-        created_at=created_course["created_at"]
-    )
+    return render(request, serialize_course(course_dict))
 
 @router.get("/", response_model=List[CourseResponse])
-async def get_courses(user_id: str = Depends(get_current_user_id)):
-    """Get all courses for the current user"""
-    db = await get_database()
+async def get_courses(
+    request: Request,
+    response: Response,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    user_id: str = Depends(get_current_user_id),
+    session: Optional[AsyncIOMotorClientSession] = Depends(read_session)
+):
+    """Get a page of courses for the current user, in creation order.
     
-    courses = await db.courses.find({"user_id": user_id}).to_list(length=None)
+    The continuation token for the next page is returned in the X-Next-Cursor header.
+    Clients sending Accept: application/x-ndjson receive every course as a stream
+    instead, one JSON object per line.
+    """
+    db = await get_database()
     
-    return [
-        CourseResponse(
-            id=str(course["_id"]),
-            course_name=course["course_name"],
-            course_code=course.get("course_code"),
-            instructor=course.get("instructor"),
-            description=course.get("description"),
-            created_at=course.get("created_at", datetime.utcnow())
+    not_modified = await conditional_get(request, response, db, user_id, ("courses",), session)
+    if not_modified:
+        return not_modified
+    
+    query = {"user_id": user_id}
+    
+    if wants_ndjson(request):
+        if cursor:
+            query.update(keyset_filter(None, cursor))
+        
+        async def serialize_batch(batch):
+            return [serialize_course(course) for course in batch]
+        
+        return ndjson_response(
+            db.courses.find(query).sort(sort_spec(None)),
+            serialize_batch,
+            settings.STREAM_BATCH_SIZE,
+            headers=cache_headers(response)
         )
-        for course in courses
-    ]
+    
+    # The streamed export above stays on the primary; a page is read from a secondary
+    # once it has caught up with the versions behind the ETag
+    async def read_page(source):
+        return await fetch_page(source.courses, query, None, limit, cursor, session)
+    
+    courses, next_cursor = await read_caught_up(read_page, session)
+    set_next_cursor(response, next_cursor)
+    return render(request, [serialize_course(course) for course in courses], response)
 
 @router.get("/{course_id}", response_model=CourseResponse)
 async def get_course(
     course_id: str,
+    request: Request,
+    response: Response,
     user_id: str = Depends(get_current_user_id)
 ):
     """Get a specific course"""
@@ -62,6 +93,10 @@ async def get_course(
     if not ObjectId.is_valid(course_id):
         raise HTTPException(status_code=400, detail="Invalid course ID")
     
+    not_modified = await conditional_get(request, response, db, user_id, ("courses",))
+    if not_modified:
+        return not_modified
+    
     course = await db.courses.find_one({
         "_id": ObjectId(course_id),
         "user_id": user_id
@@ -70,19 +105,13 @@ async def get_course(
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     
-    return CourseResponse(
-        id=str(course["_id"]),
-        course_name=course["course_name"],
-        course_code=course.get("course_code"),
-        instructor=course.get("instructor"),
-        description=course.get("description"),
-        created_at=course.get("created_at", datetime.utcnow())
-    )
+    return render(request, serialize_course(course), response)
 
 @router.put("/{course_id}", response_model=CourseResponse)
 async def update_course(
     course_id: str,
     course: CourseCreate,
+    request: Request,
     user_id: str = Depends(get_current_user_id)
 ):
     """Update a course"""
@@ -91,24 +120,18 @@ async def update_course(
     if not ObjectId.is_valid(course_id):
         raise HTTPException(status_code=400, detail="Invalid course ID")
     
-    result = await db.courses.update_one(
+    updated_course = await db.courses.find_one_and_update(
         {"_id": ObjectId(course_id), "user_id": user_id},
-        {"$set": course.dict()}
+        {"$set": course.dict()},
+        return_document=ReturnDocument.AFTER
     )
     
-    if result.matched_count == 0:
+    if updated_course is None:
         raise HTTPException(status_code=404, detail="Course not found")
     
-    updated_course = await db.courses.find_one({"_id": ObjectId(course_id)})
+    await bump_version(db, user_id, "courses")
     
-    return CourseResponse(
-        id=str(updated_course["_id"]),
-        course_name=updated_course["course_name"],
-        course_code=updated_course.get("course_code"),
-        instructor=updated_course.get("instructor"),
-        description=updated_course.get("description"),
-        created_at=updated_course.get("created_at", datetime.utcnow())
-    )
+    return render(request, serialize_course(updated_course))
 
 @router.delete("/{course_id}")
 async def delete_course(
@@ -129,4 +152,5 @@ async def delete_course(
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Course not found")
     
+    await bump_version(db, user_id, "courses")
     return {"message": "Course deleted successfully"}
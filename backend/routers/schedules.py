@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from typing import List, Optional
 from backend.models import ScheduleCreate, ScheduleResponse
 from backend.auth import get_current_user_id, get_current_user
-from backend.database import get_database
+from backend.database import get_database, read_session, read_caught_up
+from motor.motor_asyncio import AsyncIOMotorClientSession
 from bson import ObjectId
+from pymongo import ReturnDocument
 from backend.email_service import send_schedule_notification
+from backend.course_resolver import resolve_course_names, resolve_course_name
+from backend.pagination import fetch_page, set_next_cursor, date_window, keyset_filter, sort_spec
+from backend.streaming import wants_ndjson, ndjson_response
+from backend.collection_versions import bump_version, conditional_get, cache_headers
+from backend.serialization import serialize_schedule, render
+from backend.config import settings
 from datetime import datetime
 
 router = APIRouter(prefix="/api/schedules", tags=["Schedules"])
@@ -12,6 +20,7 @@ router = APIRouter(prefix="/api/schedules", tags=["Schedules"])
 @router.post("/", response_model=ScheduleResponse)
 async def create_schedule(
     schedule: ScheduleCreate,
+    request: Request,
     user_id: str = Depends(get_current_user_id),
     current_user: dict = Depends(get_current_user)
 ):
@@ -38,65 +47,91 @@ async def create_schedule(
     schedule_dict["user_id"] = user_id
     schedule_dict["created_at"] = datetime.utcnow()
     
-    result = await db.schedules.insert_one(schedule_dict)
-    created_schedule = await db.schedules.find_one({"_id": result.inserted_id})
+    # insert_one sets _id on schedule_dict, so the response is built locally
+    await db.schedules.insert_one(schedule_dict)
+    await bump_version(db, user_id, "schedules")
+    created_schedule = schedule_dict
     
     # Send email notification
     try:
         await send_schedule_notification(
-            user_email=current_user["email"],
+            user=current_user,
             schedule_title=created_schedule["title"],
             start_time=created_schedule["start_time"],
             end_time=created_schedule["end_time"]
         )
     except Exception as e:
-        print(f"Failed to send email notification: {str(e)}")
-    
-    return ScheduleResponse(
-        id=str(created_schedule["_id"]),
-        title=created_schedule["title"],
-        description=created_schedule.get("description"),
-        course_id=str(created_schedule["course_id"]) if created_schedule.get("course_id") else None,
-        course_name=course_name,
-        start_time=created_schedule["start_time"],
-        end_time=created_schedule["end_time"],
-        day_of_week=created_schedule.get("day_of_week"),
-        location=created_schedule.get("location"),
-        created_at=created_schedule.get("created_at", datetime.utcnow())
-    )
+        print(f"Failed to queue email notification: {str(e)}")
+    
+    return render(request, serialize_schedule(created_schedule, course_name=course_name))
 
 @router.get("/", response_model=List[ScheduleResponse])
-async def get_schedules(user_id: str = Depends(get_current_user_id)):
-    """Get all schedules for the current user"""
+async def get_schedules(
+    request: Request,
+    response: Response,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    course_id: Optional[str] = None,
+    start_after: Optional[datetime] = None,
+    start_before: Optional[datetime] = None,
+    user_id: str = Depends(get_current_user_id),
+    session: Optional[AsyncIOMotorClientSession] = Depends(read_session)
+):
+    """Get a page of schedules for the current user, ordered by start time.
+    
+    The continuation token for the next page is returned in the X-Next-Cursor header.
+    Clients sending Accept: application/x-ndjson receive every matching schedule
+    as a stream instead, one JSON object per line.
+    """
     db = await get_database()
     
-    schedules = await db.schedules.find({"user_id": user_id}).sort("start_time", 1).to_list(length=None)
+    not_modified = await conditional_get(request, response, db, user_id, ("schedules", "courses"), session)
+    if not_modified:
+        return not_modified
     
-    result = []
-    for schedule in schedules:
-        course_name = None
-        if schedule.get("course_id"):
-            course = await db.courses.find_one({"_id": ObjectId(schedule["course_id"])})
-            course_name = course["course_name"] if course else None
+    query = {"user_id": user_id, **date_window("start_time", start_after, start_before)}
+    if course_id is not None:
+        query["course_id"] = course_id
+    
+    if wants_ndjson(request):
+        if cursor:
+            query.update(keyset_filter("start_time", cursor))
+        
+        async def serialize_batch(batch):
+            return await _build_schedule_list(db, batch)
         
-        result.append(ScheduleResponse(
-            id=str(schedule["_id"]),
-            title=schedule["title"],
-            description=schedule.get("description"),
-            course_id=str(schedule["course_id"]) if schedule.get("course_id") else None,
-            course_name=course_name,
-            start_time=schedule["start_time"],
-            end_time=schedule["end_time"],
-            day_of_week=schedule.get("day_of_week"),
-            location=schedule.get("location"),
-            created_at=schedule.get("created_at", datetime.utcnow())
-        ))
-    
-    return result
+        return ndjson_response(
+            db.schedules.find(query).sort(sort_spec("start_time")),
+            serialize_batch,
+            settings.STREAM_BATCH_SIZE,
+            headers=cache_headers(response)
+        )
+    
+    async def read_page(source):
+        page, next_cursor = await fetch_page(source.schedules, query, "start_time", limit, cursor, session)
+        return await _build_schedule_list(source, page, session), next_cursor
+    
+    items, next_cursor = await read_caught_up(read_page, session)
+    set_next_cursor(response, next_cursor)
+    return render(request, items, response)
+
+async def _build_schedule_list(db, schedules: List[dict], session=None) -> List[dict]:
+    """Build responses for a batch of schedules, resolving course names in one query"""
+    course_names = await resolve_course_names(db, (s.get("course_id") for s in schedules), session=session)
+    
+    return [
+        serialize_schedule(
+            schedule,
+            course_name=course_names.get(str(schedule["course_id"])) if schedule.get("course_id") else None
+        )
+        for schedule in schedules
+    ]
 
 @router.get("/{schedule_id}", response_model=ScheduleResponse)
 async def get_schedule(
     schedule_id: str,
+    request: Request,
+    response: Response,
     user_id: str = Depends(get_current_user_id)
 ):
     """Get a specific schedule"""
@@ -105,6 +140,10 @@ async def get_schedule(
     if not ObjectId.is_valid(schedule_id):
         raise HTTPException(status_code=400, detail="Invalid schedule ID")
     
+    not_modified = await conditional_get(request, response, db, user_id, ("schedules", "courses"))
+    if not_modified:
+        return not_modified
+    
     schedule = await db.schedules.find_one({
         "_id": ObjectId(schedule_id),
         "user_id": user_id
@@ -113,28 +152,15 @@ async def get_schedule(
     if not schedule:
         raise HTTPException(status_code=404, detail="Schedule not found")
     
-    course_name = None
-    if schedule.get("course_id"):
-        course = await db.courses.find_one({"_id": ObjectId(schedule["course_id"])})
-        course_name = course["course_name"] if course else None
-    
-    return ScheduleResponse(
-        id=str(schedule["_id"]),
-        title=schedule["title"],
-        description=schedule.get("description"),
-        course_id=str(schedule["course_id"]) if schedule.get("course_id") else None,
-        course_name=course_name,
-        start_time=schedule["start_time"],
-        end_time=schedule["end_time"],
-        day_of_week=schedule.get("day_of_week"),
-        location=schedule.get("location"),
-        created_at=schedule.get("created_at", datetime.utcnow())
-    )
+    course_name = await resolve_course_name(db, schedule.get("course_id"))
+    
+    return render(request, serialize_schedule(schedule, course_name=course_name), response)
 
 @router.put("/{schedule_id}", response_model=ScheduleResponse)
 async def update_schedule(
     schedule_id: str,
     schedule: ScheduleCreate,
+    request: Request,
     user_id: str = Depends(get_current_user_id)
 ):
     """Update a schedule"""
@@ -159,28 +185,18 @@ async def update_schedule(
         
         course_name = course["course_name"]
     
-    result = await db.schedules.update_one(
+    updated_schedule = await db.schedules.find_one_and_update(
         {"_id": ObjectId(schedule_id), "user_id": user_id},
-        {"$set": schedule.dict()}
+        {"$set": schedule.dict()},
+        return_document=ReturnDocument.AFTER
     )
     
-    if result.matched_count == 0:
+    if updated_schedule is None:
         raise HTTPException(status_code=404, detail="Schedule not found")
     
-    updated_schedule = await db.schedules.find_one({"_id": ObjectId(schedule_id)})
-    
-    return ScheduleResponse(
-        id=str(updated_schedule["_id"]),
-        title=updated_schedule["title"],
-        description=updated_schedule.get("description"),
-        course_id=str(updated_schedule["course_id"]) if updated_schedule.get("course_id") else None,
-        course_name=course_name,
-        start_time=updated_schedule["start_time"],
-        end_time=updated_schedule["end_time"],
-        day_of_week=updated_schedule.get("day_of_week"),
-        location=updated_schedule.get("location"),
-        created_at=updated_schedule.get("created_at", datetime.utcnow())
-    )
+    await bump_version(db, user_id, "schedules")
+    
+    return render(request, serialize_schedule(updated_schedule, course_name=course_name))
 
 @router.delete("/{schedule_id}")
 async def delete_schedule(
@@ -201,4 +217,5 @@ async def delete_schedule(
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Schedule not found")
     
+    await bump_version(db, user_id, "schedules")
     return {"message": "Schedule deleted successfully"}
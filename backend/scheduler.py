@@ -1,85 +1,307 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from datetime import datetime, timedelta
-from backend.database import get_database
-from backend.email_service import send_assignment_reminder
+from typing import List, Tuple
+from backend.config import settings
+from backend.database import get_database, get_secondary_database
+from backend.email_service import render_assignment_reminder
+from backend.email_outbox import enqueue_emails, PRIORITY_BULK
+from backend.email_digest import add_many_to_digest, flush_due_digests, wants_digest, KIND_REMINDER
+from backend.course_resolver import UNKNOWN_COURSE
+from backend.reminder_queue import reminder_key
+from backend.coordination import (
+    INSTANCE_ID, acquire_lease, complete_lease, release_lease, heartbeat, healthy_instances, shard_filter,
+    firing_members
+)
 import asyncio
+import time
+import uuid
 
 scheduler = AsyncIOScheduler()
 
-async def check_assignment_reminders():
-    """Check for assignments due in 2 days and send reminders"""
+# The scan reminds about assignments due in about 2 days
+SCAN_HORIZON_HOURS = 48
+
+def _reminder_pipeline(now: datetime, shard: int = 0, shards: int = 1) -> list:
+    """Unsent reminders due in about 2 days, joined with user email and course name"""
+    window_end = now + timedelta(days=2, hours=1)
+    return [
+        {"$match": {
+            "due_date": {"$gte": now, "$lte": window_end},
+            "completed": False,
+            "reminder_sent": False,
+            **shard_filter(shard, shards)
+        }},
+        {"$lookup": {
+            "from": "users",
+            "let": {"user_id": {"$convert": {"input": "$user_id", "to": "objectId", "onError": None, "onNull": None}}},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$user_id"]}}},
+                {"$project": {"_id": 0, "email": 1, "email_digest": 1}}
+            ],
+            "as": "user"
+        }},
+        {"$unwind": "$user"},
+        {"$lookup": {
+            "from": "courses",
+            "let": {"course_id": {"$convert": {"input": "$course_id", "to": "objectId", "onError": None, "onNull": None}}},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$course_id"]}}},
+                {"$project": {"_id": 0, "course_name": 1}}
+            ],
+            "as": "course"
+        }},
+        {"$project": {
+            "title": 1,
+            "due_date": 1,
+            "email": "$user.email",
+            "email_digest": "$user.email_digest",
+            "course_name": {"$ifNull": [{"$arrayElemAt": ["$course.course_name", 0]}, UNKNOWN_COURSE]}
+        }}
+    ]
+
+async def _claim_reminders(db, batch: List[dict]) -> Tuple[str, List[dict]]:
+    """Flag a batch as reminded, keeping only the assignments this run won.
+
+    The update only matches assignments still unsent, so an assignment
+    scanned by two instances at once is claimed by exactly one of them.
+    Returns the claim id and the won assignments.
+    """
+    claim = uuid.uuid4().hex
+    await db.assignments.update_many(
+        {"_id": {"$in": [item["_id"] for item in batch]}, "reminder_sent": False},
+        {"$set": {"reminder_sent": True, "reminder_claim": claim}}
+    )
+    won = {doc["_id"] async for doc in db.assignments.find({"reminder_claim": claim}, {"_id": 1})}
+    return claim, [item for item in batch if item["_id"] in won]
+
+async def _release_claim(db, claim: str) -> None:
+    """Mark a claimed batch unsent again so the retried run finds it"""
+    await db.assignments.update_many(
+        {"reminder_claim": claim},
+        {"$set": {"reminder_sent": False}, "$unset": {"reminder_claim": ""}}
+    )
+
+def _render_reminders(batch: List[dict]) -> Tuple[List[tuple], List[tuple]]:
+    """Render a batch of reminders, split into immediate emails and digest items.
+
+    Each carries a dedupe key, so re-queueing a batch after a failed attempt
+    drops what that attempt had already queued.
+    """
+    messages, held = [], []
+    for item in batch:
+        subject, body = render_assignment_reminder(item["title"], item["course_name"], item["due_date"])
+        key = reminder_key(item["_id"], SCAN_HORIZON_HOURS)
+        if wants_digest(item):
+            held.append((item["email"], KIND_REMINDER, subject, body, key))
+        else:
+            messages.append((item["email"], subject, body, key))
+    return messages, held
+
+async def _process_reminder_batch(db, batch: List[dict], stats: dict) -> None:
+    """Claim one batch of assignments and queue their reminder emails"""
+    started = time.perf_counter()
+    claim, batch = await _claim_reminders(db, batch)
+    claimed = time.perf_counter()
+    stats["claim_s"] += claimed - started
+    
+    messages, held = _render_reminders(batch)
+    rendered = time.perf_counter()
+    stats["render_s"] += rendered - claimed
+    
     try:
+        await enqueue_emails(messages, PRIORITY_BULK)
+        await add_many_to_digest(held, PRIORITY_BULK)
+    except Exception:
+        # Unflag the batch so the retried scan finds it; dedupe keys drop whatever was queued
+        await _release_claim(db, claim)
+        raise
+    stats["enqueue_s"] += time.perf_counter() - rendered
+    stats["digested"] += len(held)
+    stats["queued"] += len(batch)
+
+async def check_assignment_reminders(shard: int = 0, shards: int = 1) -> dict:
+    """Check for assignments due in 2 days and send reminders.
+    
+    Streams the joined assignments in batches of REMINDER_BATCH_SIZE and keeps up
+    to REMINDER_CONCURRENCY batches in flight while the next one is fetched.
+    With shards > 1 only users whose bucket falls in `shard` are scanned.
+    Returns per-stage timings for the run.
+    """
+    stats = {"matched": 0, "queued": 0, "digested": 0, "batches": 0, "fetch_s": 0.0, "claim_s": 0.0, "render_s": 0.0, "enqueue_s": 0.0}
+    run_started = time.perf_counter()
+    in_flight = set()
+    
+    async def dispatch(batch):
+        stats["batches"] += 1
+        if len(in_flight) >= settings.REMINDER_CONCURRENCY:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            in_flight.difference_update(done)
+            for task in done:
+                task.result()
+        in_flight.add(asyncio.create_task(_process_reminder_batch(db, batch, stats)))
+    
+    try:
+        # Scan a secondary; claims go to the primary and only match still-unsent
+        # assignments, so an assignment already claimed but not yet replicated is skipped
         db = await get_database()
+        secondary = await get_secondary_database()
+        cursor = secondary.assignments.aggregate(
+            _reminder_pipeline(datetime.utcnow(), shard, shards),
+            batchSize=settings.REMINDER_BATCH_SIZE
+        )
         
-        # Calculate the date range for assignments due in approximately 2 days
-        now = datetime.utcnow()
-        two_days_from_now = now + timedelta(days=2)
-        two_days_plus_one_hour = two_days_from_now + timedelta(hours=1)
+        batch = []
+        fetch_started = time.perf_counter()
+        async for item in cursor:
+            batch.append(item)
+            if len(batch) >= settings.REMINDER_BATCH_SIZE:
+                stats["fetch_s"] += time.perf_counter() - fetch_started
+                stats["matched"] += len(batch)
+                await dispatch(batch)
+                batch = []
+                fetch_started = time.perf_counter()
+        stats["fetch_s"] += time.perf_counter() - fetch_started
+        if batch:
+            stats["matched"] += len(batch)
+            await dispatch(batch)
         
-        # Find assignments due within the next 2 days that haven't been reminded yet
-        assignments = await db.assignments.find({
-            "due_date": {
-                "$gte": now,
-                "$lte": two_days_plus_one_hour
-            },
-            "completed": False,
-            "reminder_sent": {"$ne": True}
-        }).to_list(length=None)
+        if in_flight:
+            for task in await asyncio.gather(*in_flight, return_exceptions=True):
+                if isinstance(task, Exception):
+                    raise task
+    except Exception as e:
+        stats["error"] = str(e)
+        print(f"Error in check_assignment_reminders: {str(e)}")
+    
+    elapsed = time.perf_counter() - run_started
+    stats["elapsed_s"] = elapsed
+    print(
+        f"Reminder run (shard {shard + 1}/{shards}): {stats['queued']}/{stats['matched']} reminders queued "
+        f"({stats['digested']} held for digests) in {stats['batches']} batches, "
+        f"{elapsed:.2f}s ({stats['queued'] / elapsed if elapsed else 0:.0f}/s); "
+        f"fetch {stats['fetch_s']:.2f}s, claim {stats['claim_s']:.2f}s, "
+        f"render {stats['render_s']:.2f}s, enqueue {stats['enqueue_s']:.2f}s"
+    )
+    return stats
+
+async def _run_leased(db, lease: str, shard: int, shards: int) -> bool:
+    """Run one reminder scan under a lease; returns whether this instance ran it.
+    
+    A failed scan is retried up to REMINDER_RUN_ATTEMPTS times while the lease
+    is held. If every attempt fails the lease is released, and the work waits
+    for the next firing (or an instance still working through this one).
+    """
+    if not await acquire_lease(db, lease):
+        return False
+    delay = settings.REMINDER_RETRY_DELAY_SECONDS
+    for attempt in range(settings.REMINDER_RUN_ATTEMPTS):
+        if attempt:
+            await asyncio.sleep(delay)
+            delay *= 2
+            # Renew the lease; it only fails if it expired and another instance took over
+            if not await acquire_lease(db, lease):
+                return True
+        stats = await check_assignment_reminders(shard, shards)
+        if "error" not in stats:
+            await complete_lease(db, lease)
+            return True
+        print(f"Reminder run {lease} failed (attempt {attempt + 1}/{settings.REMINDER_RUN_ATTEMPTS})")
+    await release_lease(db, lease)
+    return True
+
+async def run_reminder_job(job_id: str):
+    """Run a reminder firing exactly once across every app instance.
+    
+    Without sharding one instance wins the firing's lease and scans
+    everything. With REMINDER_SHARDING each healthy instance scans its own
+    share of users first, then picks up any share whose owner never started.
+    """
+    try:
+        db = await get_database()
+        firing = f"{job_id}:{datetime.utcnow():%Y-%m-%dT%H}"
         
-        print(f"Found {len(assignments)} assignments needing reminders")
+        if not settings.REMINDER_SHARDING:
+            if not await _run_leased(db, firing, 0, 1):
+                print(f"Reminder firing {firing} is handled by another instance")
+            return
         
-        for assignment in assignments:
-            # Get user email
-            user = await db.users.find_one({"_id": assignment["user_id"]})
-            if not user:
-                continue
-            
-            # Get course name
-            course = await db.courses.find_one({"_id": assignment["course_id"]})
-            course_name = course["course_name"] if course else "Unknown Course"
-            
-            # Send reminder email
-            await send_assignment_reminder(
-                user_email=user["email"],
-                assignment_title=assignment["title"],
-                course_name=course_name,
-                due_date=assignment["due_date"]
-            )
-            
-            # Mark reminder as sent
-            await db.assignments.update_one(
-                {"_id": assignment["_id"]},
-                {"$set": {"reminder_sent": True}}
-            )
-            
-            print(f"Sent reminder for assignment: {assignment['title']} to {user['email']}")
-            
+        instances = await firing_members(db, firing, await healthy_instances(db))
+        shards = len(instances)
+        # An instance missing from the snapshot takes whichever shards are still unclaimed
+        own = instances.index(INSTANCE_ID) if INSTANCE_ID in instances else 0
+        for offset in range(shards):
+            shard = (own + offset) % shards
+            await _run_leased(db, f"{firing}:shard-{shard}-of-{shards}", shard, shards)
     except Exception as e:
-        print(f"Error in check_assignment_reminders: {str(e)}")
+        print(f"Error in run_reminder_job: {str(e)}")
+
+async def send_heartbeat():
+    """Keep this instance in the pool that reminder shards are split across"""
+    try:
+        await heartbeat(await get_database())
+    except Exception as e:
+        print(f"Error in send_heartbeat: {str(e)}")
+
+async def flush_email_digests():
+    """Queue one email per user whose digest window has closed"""
+    try:
+        await flush_due_digests()
+    except Exception as e:
+        print(f"Error in flush_email_digests: {str(e)}")
 
 def start_scheduler():
-    """Start the scheduler with jobs at 10 AM and 3 PM"""
-    # Schedule for 10:00 AM
+    """Start the scheduler (with reminder jobs at 10 AM and 3 PM in scan mode)"""
+    if settings.REMINDER_DISPATCH == "scan":
+        # Schedule for 10:00 AM
+        scheduler.add_job(
+            run_reminder_job,
+            CronTrigger(hour=10, minute=0),
+            args=["reminder_10am"],
+            id="reminder_10am",
+            name="Check assignment reminders at 10 AM",
+            replace_existing=True
+        )
+        
+        # Schedule for 3:00 PM (15:00)
+        scheduler.add_job(
+            run_reminder_job,
+            CronTrigger(hour=15, minute=0),
+            args=["reminder_3pm"],
+            id="reminder_3pm",
+            name="Check assignment reminders at 3 PM",
+            replace_existing=True
+        )
+    
+    # Advertise this instance so reminder scans can be split across all of them
     scheduler.add_job(
-        check_assignment_reminders,
-        CronTrigger(hour=10, minute=0),
-        id="reminder_10am",
-        name="Check assignment reminders at 10 AM",
-        replace_existing=True
+        send_heartbeat,
+        IntervalTrigger(seconds=settings.INSTANCE_HEARTBEAT_SECONDS),
+        id="instance_heartbeat",
+        name="Scheduler instance heartbeat",
+        replace_existing=True,
+        next_run_time=datetime.now(),
+        max_instances=1,
+        coalesce=True
     )
     
-    # Schedule for 3:00 PM (15:00)
+    # Send digests whose window has closed
     scheduler.add_job(
-        check_assignment_reminders,
-        CronTrigger(hour=15, minute=0),
-        id="reminder_3pm",
-        name="Check assignment reminders at 3 PM",
-        replace_existing=True
+        flush_email_digests,
+        IntervalTrigger(seconds=settings.EMAIL_DIGEST_FLUSH_INTERVAL_SECONDS),
+        id="email_digests",
+        name="Flush due email digests",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
     )
     
     scheduler.start()
-    print("Scheduler started - Reminders will be sent at 10 AM and 3 PM")
+    if settings.REMINDER_DISPATCH == "scan":
+        print("Scheduler started - Reminders will be sent at 10 AM and 3 PM")
+    else:
+        print("Scheduler started - Reminders are dispatched as they come due")
 
 def stop_scheduler():
     """Stop the scheduler"""
@@ -0,0 +1,93 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, Response
+from backend.models import AssignmentResponse, CourseResponse, ScheduleResponse, UserResponse
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is optional; clients asking for it get JSON instead
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+def compile_serializer(
+    model,
+    converters: Optional[Dict[str, Callable[[Any], Any]]] = None,
+    fallbacks: Optional[Dict[str, Callable[[], Any]]] = None,
+) -> Callable[..., dict]:
+    """Build a serializer from trusted Mongo documents to response-model dicts.
+
+    The field plan is computed once from the model, so serializing a document is
+    a single pass over a tuple with no validation. `id` is read from `_id`;
+    `converters` are applied to non-null values and `fallbacks` produce values
+    for missing fields. Keyword arguments to the serializer override fields
+    that do not come from the document (e.g. course_name).
+    """
+    converters = converters or {}
+    fallbacks = fallbacks or {}
+    plan = tuple(
+        (
+            name,
+            "_id" if name == "id" else name,
+            converters.get(name),
+            fallbacks.get(name),
+            field.default,
+        )
+        for name, field in model.__fields__.items()
+    )
+
+    def serialize(document: dict, **extra) -> dict:
+        data = {}
+        for name, key, convert, fallback, default in plan:
+            if name in extra:
+                value = extra[name]
+            elif key in document:
+                value = document[key]
+            elif fallback is not None:
+                value = fallback()
+            else:
+                value = default
+            if convert is not None and value is not None:
+                value = convert(value)
+            data[name] = value
+        return data
+
+    return serialize
+
+serialize_course = compile_serializer(
+    CourseResponse, converters={"id": str}, fallbacks={"created_at": datetime.utcnow}
+)
+serialize_assignment = compile_serializer(
+    AssignmentResponse, converters={"id": str, "course_id": str}, fallbacks={"created_at": datetime.utcnow}
+)
+serialize_schedule = compile_serializer(
+    ScheduleResponse, converters={"id": str, "course_id": str}, fallbacks={"created_at": datetime.utcnow}
+)
+serialize_user = compile_serializer(UserResponse, converters={"id": str})
+
+def _msgpack_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+class MsgPackResponse(Response):
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, default=_msgpack_default, use_bin_type=True)
+
+def wants_msgpack(request: Request) -> bool:
+    accept = request.headers.get("accept", "")
+    return msgpack is not None and any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+def render(request: Request, content: Any, response: Optional[Response] = None, status_code: int = 200) -> Response:
+    """Encode already-serialized content as orjson, or MessagePack when negotiated.
+
+    Headers set on the route's injected `response` (ETag, X-Next-Cursor, ...)
+    are carried over, since returning a Response directly bypasses it.
+    """
+    headers = dict(response.headers) if response is not None else {}
+    headers["Vary"] = "Accept"
+    response_class = MsgPackResponse if wants_msgpack(request) else ORJSONResponse
+    return response_class(content, status_code=status_code, headers=headers)
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from email.message import Message
+from typing import Deque, Optional
+import aiosmtplib
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean the connection itself is unusable and is worth one reconnect
+_CONNECTION_ERRORS = (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, ConnectionError)
+
+class _PooledConnection:
+    __slots__ = ("smtp", "last_used", "messages_sent")
+
+    def __init__(self, smtp: aiosmtplib.SMTP):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+        self.messages_sent = 0
+
+class SMTPPool:
+    """A bounded pool of connected, authenticated SMTP sessions.
+
+    Connections are opened on demand up to `size`, reused most-recently-used
+    first, kept alive with NOOP while idle and closed once idle for longer
+    than `idle_timeout` or after `max_messages` sends.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        start_tls: bool = True,
+        size: int = 4,
+        idle_timeout: float = 60,
+        keepalive_interval: float = 30,
+        max_messages: int = 100,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username or None
+        self.password = password or None
+        self.start_tls = start_tls
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self.max_messages = max_messages
+        self._idle: Deque[_PooledConnection] = deque()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._reaper: Optional[asyncio.Task] = None
+
+    @property
+    def started(self) -> bool:
+        return self._slots is not None
+
+    async def start(self) -> None:
+        self._slots = asyncio.Semaphore(self.size)
+        self._reaper = asyncio.create_task(self._reap(), name="smtp-pool-reaper")
+
+    async def stop(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+        while self._idle:
+            await self._close(self._idle.popleft())
+        self._slots = None
+
+    async def _connect(self) -> _PooledConnection:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            start_tls=self.start_tls,
+        )
+        # connect() also negotiates STARTTLS and authenticates
+        await smtp.connect()
+        return _PooledConnection(smtp)
+
+    async def _close(self, connection: _PooledConnection) -> None:
+        try:
+            if connection.smtp.is_connected:
+                await asyncio.wait_for(connection.smtp.quit(), timeout=5)
+        except Exception:
+            connection.smtp.close()
+
+    def _reusable(self, connection: _PooledConnection) -> bool:
+        return (
+            connection.smtp.is_connected
+            and connection.messages_sent < self.max_messages
+            and time.monotonic() - connection.last_used < self.idle_timeout
+        )
+
+    async def _acquire(self) -> _PooledConnection:
+        await self._slots.acquire()
+        try:
+            while self._idle:
+                connection = self._idle.pop()
+                if self._reusable(connection):
+                    return connection
+                await self._close(connection)
+            return await self._connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def _release(self, connection: _PooledConnection, healthy: bool) -> None:
+        try:
+            if healthy and self._reusable(connection):
+                connection.last_used = time.monotonic()
+                self._idle.append(connection)
+            else:
+                await self._close(connection)
+        finally:
+            self._slots.release()
+
+    async def send_message(self, message: Message) -> None:
+        connection = await self._acquire()
+        healthy = True
+        try:
+            try:
+                await connection.smtp.send_message(message)
+            except _CONNECTION_ERRORS:
+                # The server dropped an idle session; reconnect once and retry
+                await self._close(connection)
+                connection = await self._connect()
+                await connection.smtp.send_message(message)
+            connection.messages_sent += 1
+        except BaseException:
+            healthy = False
+            raise
+        finally:
+            await self._release(connection, healthy)
+
+    async def _reap(self) -> None:
+        """Evict connections idle past idle_timeout and NOOP the rest"""
+        while True:
+            await asyncio.sleep(max(1.0, self.keepalive_interval / 2))
+            for _ in range(len(self._idle)):
+                if not self._idle:
+                    break
+                await self._slots.acquire()
+                try:
+                    connection = self._idle.popleft()
+                    idle_for = time.monotonic() - connection.last_used
+                    if idle_for >= self.idle_timeout or not connection.smtp.is_connected:
+                        await self._close(connection)
+                        continue
+                    if idle_for >= self.keepalive_interval:
+                        try:
+                            await connection.smtp.noop()
+                        except Exception as e:
+                            logger.info(f"SMTP keep-alive failed, dropping connection: {e}")
+                            await self._close(connection)
+                            continue
+                    self._idle.append(connection)
+                finally:
+                    self._slots.release()
+
+# Create a singleton instance
+smtp_pool = SMTPPool(
+    hostname=settings.SMTP_HOST,
+    port=settings.SMTP_PORT,
+    username=settings.SMTP_USER,
+    password=settings.SMTP_PASSWORD,
+    start_tls=settings.SMTP_START_TLS,
+    size=settings.SMTP_POOL_SIZE,
+    idle_timeout=settings.SMTP_IDLE_TIMEOUT_SECONDS,
+    keepalive_interval=settings.SMTP_KEEPALIVE_SECONDS,
+    max_messages=settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+)
@@ -0,0 +1,102 @@
+import asyncio
+import orjson
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+# An SSE comment: ignored by clients, but keeps proxies from timing out an idle stream
+_SSE_HEARTBEAT = b": ping\n\n"
+_END = object()
+
+# Turns a batch of raw documents into JSON-ready dicts (e.g. resolving course names)
+BatchSerializer = Callable[[List[dict]], Awaitable[List[dict]]]
+
+def wants_ndjson(request: Request) -> bool:
+    """True when the client opted into streaming via the Accept header"""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+async def _iter_batches(cursor, batch_size: int) -> AsyncIterator[List[dict]]:
+    batch = []
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def _ndjson_lines(cursor, serialize_batch: BatchSerializer, batch_size: int) -> AsyncIterator[bytes]:
+    async for batch in _iter_batches(cursor, batch_size):
+        items = await serialize_batch(batch)
+        yield b"".join(orjson.dumps(item) + b"\n" for item in items)
+
+def ndjson_response(
+    cursor,
+    serialize_batch: BatchSerializer,
+    batch_size: int,
+    headers: Optional[dict] = None,
+) -> StreamingResponse:
+    """Stream a Motor cursor as one JSON object per line.
+
+    Documents are fetched and written one batch at a time, so memory is bounded
+    by batch_size rather than by the size of the result set.
+    """
+    cursor = cursor.batch_size(batch_size)
+    return StreamingResponse(
+        _ndjson_lines(cursor, serialize_batch, batch_size),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers=headers,
+    )
+
+def sse_event(data: dict, event: Optional[str] = None) -> bytes:
+    """Encode one server-sent event with a JSON payload"""
+    prefix = b"event: " + event.encode() + b"\n" if event else b""
+    return prefix + b"data: " + orjson.dumps(data) + b"\n\n"
+
+async def _with_heartbeat(request: Request, events: AsyncIterator[bytes], interval: float) -> AsyncIterator[bytes]:
+    """Forward events as they arrive, emitting a heartbeat whenever the source is quiet.
+
+    The source runs in its own task behind a one-slot queue, so it never gets
+    more than one event ahead of the client. When the client goes away the
+    task is cancelled, which stops whatever upstream work it was awaiting.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+    async def produce():
+        try:
+            async for chunk in events:
+                await queue.put(chunk)
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(_END)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=interval)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield _SSE_HEARTBEAT
+                continue
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+
+def sse_response(request: Request, events: AsyncIterator[bytes], heartbeat_seconds: float) -> StreamingResponse:
+    """Stream pre-encoded server-sent events with heartbeats and disconnect handling"""
+    return StreamingResponse(
+        _with_heartbeat(request, events, heartbeat_seconds),
+        media_type=SSE_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
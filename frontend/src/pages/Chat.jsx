@@ -39,15 +39,22 @@ const Chat = () => {
     setLoading(true);
 
     try {
-      const response = await chatAPI.sendMessage(input);
-      const assistantMessage = {
-        role: 'assistant',
-        content: response.data.response,
-        timestamp: new Date(response.data.timestamp),
-      };
-      setMessages((prev) => [...prev, assistantMessage]);
+      // Show the reply as it streams in; the first chunk replaces the spinner
+      let started = false;
+      await chatAPI.streamMessage(input, (delta) => {
+        if (!started) {
+          started = true;
+          setLoading(false);
+          setMessages((prev) => [...prev, { role: 'assistant', content: delta, timestamp: new Date() }]);
+          return;
+        }
+        setMessages((prev) => {
+          const last = prev[prev.length - 1];
+          return [...prev.slice(0, -1), { ...last, content: last.content + delta }];
+        });
+      });
     } catch (error) {
-      toast.error(error.response?.data?.detail || 'Failed to get response from AI');
+      toast.error(error.response?.data?.detail || error.message || 'Failed to get response from AI');
       const errorMessage = {
         role: 'assistant',
         content: "I apologize, but I'm having trouble processing your request. Please make sure your OpenAI API key is configured correctly in the backend .env file.",
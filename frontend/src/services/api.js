@@ -24,6 +24,19 @@ api.interceptors.request.use(
   }
 );
 
+// Follow X-Next-Cursor continuation tokens and return every page as one list
+const getAllPages = async (url, params = {}) => {
+  let items = [];
+  let cursor;
+  let response;
+  do {
+    response = await api.get(url, { params: { ...params, cursor } });
+    items = items.concat(response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return { ...response, data: items };
+};
+
 // Auth API
 export const authAPI = {
   register: (data) => api.post('/api/auth/register', data),
@@ -40,7 +53,7 @@ export const authAPI = {
 
 // Courses API
 export const coursesAPI = {
-  getAll: () => api.get('/api/courses/'),
+  getAll: (params) => getAllPages('/api/courses/', params),
   getById: (id) => api.get(`/api/courses/${id}`),
   create: (data) => api.post('/api/courses/', data),
   update: (id, data) => api.put(`/api/courses/${id}`, data),
@@ -49,7 +62,7 @@ export const coursesAPI = {
 
 // Assignments API
 export const assignmentsAPI = {
-  getAll: () => api.get('/api/assignments/'),
+  getAll: (params) => getAllPages('/api/assignments/', params),
   getById: (id) => api.get(`/api/assignments/${id}`),
   create: (data) => api.post('/api/assignments/', data),
   update: (id, data) => api.put(`/api/assignments/${id}`, data),
@@ -59,7 +72,7 @@ export const assignmentsAPI = {
 
 // Schedules API
 export const schedulesAPI = {
-  getAll: () => api.get('/api/schedules/'),
+  getAll: (params) => getAllPages('/api/schedules/', params),
   getById: (id) => api.get(`/api/schedules/${id}`),
   create: (data) => api.post('/api/schedules/', data),
   update: (id, data) => api.put(`/api/schedules/${id}`, data),
@@ -69,6 +82,48 @@ export const schedulesAPI = {
 // Chat API
 export const chatAPI = {
   sendMessage: (message) => api.post('/api/chat/', { message }),
+  // Stream the reply as server-sent events, calling onToken for each chunk of text.
+  // Aborting `signal` closes the connection, which also stops generation on the server.
+  streamMessage: async (message, onToken, signal) => {
+    const response = await fetch(`${API_BASE_URL}/api/chat/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        Authorization: `Bearer ${localStorage.getItem('token')}`,
+      },
+      body: JSON.stringify({ message }),
+      credentials: 'include',
+      signal,
+    });
+    if (!response.ok) {
+      throw new Error(`Chat request failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const events = buffer.split('\n\n');
+      buffer = events.pop();
+      for (const raw of events) {
+        let event = 'message';
+        let data = '';
+        for (const line of raw.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        }
+        if (!data) continue; // heartbeat
+        const payload = JSON.parse(data);
+        if (event === 'token') onToken(payload.delta);
+        else if (event === 'error') throw new Error(payload.detail);
+        else if (event === 'done') return payload;
+      }
+    }
+    return null;
+  },
 };
 
 export default api;
@@ -0,0 +1,56 @@
+import asyncio
+from backend.ai_chatbot import chatbot
+from backend.conversation import conversation_memory, ROLE_USER, ROLE_ASSISTANT
+from backend.llm_cache import llm_cache
+from backend.loadtest.standins import StubChatModel, install_stub_llm
+
+def test_repeated_question_calls_the_model_once(monkeypatch):
+    model = StubChatModel(first_token_ms=0, token_ms=0, tokens=5, jitter=0)
+    install_stub_llm(model)
+    history = []
+
+    async def load(user_id):
+        return "", list(history)
+
+    def record_turn(user_id, message, reply, summarize):
+        history.extend([(ROLE_USER, message), (ROLE_ASSISTANT, reply)])
+
+    async def get_user_context(user_id):
+        return {"courses": [], "assignments": [], "schedules": []}
+
+    monkeypatch.setattr(conversation_memory, "load", load)
+    monkeypatch.setattr(conversation_memory, "record_turn", record_turn)
+    monkeypatch.setattr(chatbot, "get_user_context", get_user_context)
+
+    async def ask_twice():
+        first = await chatbot.chat("cache-test-user", "How should I plan my week?")
+        second = await chatbot.chat("cache-test-user", "how should I plan my week")
+        return first, second
+
+    first, second = asyncio.run(ask_twice())
+    assert first == second
+    assert model.calls == 1
+    assert len(history) == 4
+
+def test_cached_replies_are_not_shared_between_users(monkeypatch):
+    model = StubChatModel(first_token_ms=0, token_ms=0, tokens=5, jitter=0)
+    install_stub_llm(model)
+
+    async def load(user_id):
+        return "", []
+
+    async def get_user_context(user_id):
+        return {"courses": [], "assignments": [], "schedules": []}
+
+    monkeypatch.setattr(conversation_memory, "load", load)
+    monkeypatch.setattr(conversation_memory, "record_turn", lambda *args: None)
+    monkeypatch.setattr(chatbot, "get_user_context", get_user_context)
+
+    async def ask_as_two_users():
+        await chatbot.chat("cache-user-a", "What is due next?")
+        await chatbot.chat("cache-user-b", "What is due next?")
+
+    hits = llm_cache.hits
+    asyncio.run(ask_as_two_users())
+    assert model.calls == 2
+    assert llm_cache.hits == hits